@@ -0,0 +1,282 @@
+"""
+Headless HTTP API for the analyzers and insight generators
+
+    python api.py --port 8000
+
+Endpoints (JSON responses):
+  GET  /health
+  POST /v1/data                raw CSV body, streamed     -> dataset summary
+  POST /v1/image               raw image body, streamed   -> full image analysis
+       ?max_dimension=1024     optional preview resolution
+  POST /v1/text                {"text": ...}              -> stats, sentiment, keywords, summary
+  POST /v1/text/batch          {"texts": [...]}           -> list of the above
+  POST /v1/insights/<kind>     kind: data | text | image, body: analysis result
+       ?stream=1               plain-text chunks as the model produces them
+  POST /v1/insights/batch      {"requests": [{"kind": ..., "input": {...}}, ...]}
+  GET  /v1/traces              per-step timings of recent analyses (SMART_INSIGHT_PROFILE
+                               =cpu|memory adds profiles)
+
+Analysis runs on a thread pool; results are memoized by content hash.
+"""
+import os
+import sys
+import json
+import asyncio
+import hashlib
+import argparse
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import tornado.web
+import tornado.netutil
+import tornado.httpserver
+from tornado.ioloop import IOLoop
+
+# Load modules
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "modules"))
+from config import Config
+from data_analyzer import DataAnalyzer
+from text_analyzer import TextAnalyzer
+from image_analyzer import ImageAnalyzer
+from result_memo import ResultMemo, content_digest
+# Same module object the analyzers record spans into (they import it via modules.)
+from modules.instrumentation import RECENT_TRACES, span_totals, trace
+from ai_engine import AIEngine, DataInsightGenerator, TextInsightGenerator, ImageInsightGenerator
+
+MAX_BATCH = 64
+WORKERS = ThreadPoolExecutor(max_workers=os.cpu_count() or 4, thread_name_prefix="api")
+MEMO = ResultMemo(max_bytes=256 * 1024 ** 2)
+
+INSIGHT_GENERATORS = {
+    "data": (DataInsightGenerator, lambda gen, data: gen.dataset_prompt(data)),
+    "text": (TextInsightGenerator, lambda gen, data: gen.summary_prompt(
+        data.get("text", ""), data.get("summary", ""), data.get("keywords"))),
+    "image": (ImageInsightGenerator, lambda gen, data: gen.image_prompt(data)),
+}
+
+
+def _json_default(value):
+    if isinstance(value, np.generic):
+        return value.item()
+    if isinstance(value, np.ndarray):
+        return value.tolist()
+    return str(value)
+
+
+# ===========================
+# Analysis (runs on WORKERS)
+# ===========================
+def summarize_csv(buffer, name):
+    with trace(f"data {name}"):
+        analyzer = DataAnalyzer(buffer, name=name)
+        if not analyzer.load_data():
+            raise ValueError(f"Could not parse {name} as CSV")
+        return analyzer.get_ai_summary()
+
+
+def analyze_text(text):
+    with trace("text"):
+        analyzer = TextAnalyzer(text)
+        return {
+            "stats": analyzer.get_basic_stats(),
+            "sentiment": analyzer.sentiment_analysis(),
+            "keywords": analyzer.extract_keywords(15),
+            "summary": analyzer.extractive_summary(3)
+        }
+
+
+def analyze_image(buffer, name, max_dimension):
+    with trace(f"image {name}"):
+        results = ImageAnalyzer(buffer, max_dimension=max_dimension, name=name).full_analysis()
+    if results is None:
+        raise ValueError(f"Could not decode {name} as an image")
+    return results
+
+
+# ===========================
+# Handlers
+# ===========================
+class BaseHandler(tornado.web.RequestHandler):
+
+    def write_json(self, payload, status=200):
+        self.set_status(status)
+        self.set_header("Content-Type", "application/json")
+        self.finish(json.dumps(payload, default=_json_default))
+
+    def write_error(self, status_code, **kwargs):
+        self.write_json({"error": self._reason}, status_code)
+
+    def json_body(self):
+        try:
+            body = json.loads(self.request.body or b"{}")
+        except ValueError:
+            raise tornado.web.HTTPError(400, reason="Body must be JSON")
+        if not isinstance(body, dict):
+            raise tornado.web.HTTPError(400, reason="Body must be a JSON object")
+        return body
+
+    async def run(self, fn, *args):
+        """Run blocking work on the pool; ValueError becomes a 400"""
+        try:
+            return await IOLoop.current().run_in_executor(WORKERS, fn, *args)
+        except ValueError as e:
+            raise tornado.web.HTTPError(400, reason=str(e).splitlines()[0])
+
+    async def memoized(self, key, fn, *args):
+        return await self.run(MEMO.get_or_compute, key, lambda: fn(*args))
+
+
+class HealthHandler(BaseHandler):
+    def get(self):
+        self.write_json({"status": "ok", "memo": MEMO.stats()})
+
+
+class TracesHandler(BaseHandler):
+    def get(self):
+        limit = int(self.get_query_argument("limit", "10"))
+        self.write_json({"recent": list(RECENT_TRACES)[-limit:], "totals": span_totals()})
+
+
+@tornado.web.stream_request_body
+class UploadHandler(BaseHandler):
+    """Raw-body upload: chunks are hashed and buffered as they arrive"""
+
+    def prepare(self):
+        self.request.connection.set_max_body_size(Config.MAX_FILE_SIZE)
+        length = int(self.request.headers.get("Content-Length") or 0)
+        if length > Config.MAX_FILE_SIZE:
+            raise tornado.web.HTTPError(413, reason=f"Upload exceeds {Config.MAX_FILE_SIZE} bytes")
+        self.buffer = bytearray()
+        self.hasher = hashlib.sha256()
+
+    def data_received(self, chunk):
+        self.buffer += chunk
+        self.hasher.update(chunk)
+
+    @property
+    def upload_name(self):
+        return self.get_query_argument("name", "upload")
+
+
+class DataHandler(UploadHandler):
+    async def post(self):
+        key = ("api-data", self.hasher.hexdigest())
+        self.write_json(await self.memoized(key, summarize_csv, self.buffer, self.upload_name))
+
+
+class ImageHandler(UploadHandler):
+    async def post(self):
+        max_dimension = self.get_query_argument("max_dimension", None)
+        max_dimension = int(max_dimension) if max_dimension else None
+        key = ("api-image", self.hasher.hexdigest(), max_dimension)
+        self.write_json(await self.memoized(key, analyze_image, self.buffer, self.upload_name,
+                                            max_dimension))
+
+
+class TextHandler(BaseHandler):
+    async def post(self):
+        text = self.json_body().get("text") or ""
+        if not isinstance(text, str) or not text.strip():
+            raise tornado.web.HTTPError(400, reason="'text' is required")
+        self.write_json(await self.memoized(("api-text", content_digest(text)), analyze_text, text))
+
+
+class TextBatchHandler(BaseHandler):
+    async def post(self):
+        texts = self.json_body().get("texts") or []
+        if not isinstance(texts, list) or not texts or len(texts) > MAX_BATCH:
+            raise tornado.web.HTTPError(400, reason=f"'texts' must hold 1-{MAX_BATCH} items")
+        if not all(isinstance(text, str) for text in texts):
+            raise tornado.web.HTTPError(400, reason="'texts' must be strings")
+        results = await asyncio.gather(*(
+            self.memoized(("api-text", content_digest(text)), analyze_text, text) for text in texts
+        ))
+        self.write_json({"results": results})
+
+
+class InsightHandler(BaseHandler):
+    async def post(self, kind):
+        if kind not in INSIGHT_GENERATORS:
+            raise tornado.web.HTTPError(404, reason=f"Unknown insight kind '{kind}'")
+        generator_class, build_prompt = INSIGHT_GENERATORS[kind]
+        generator = generator_class(self.get_query_argument("provider", "gemini"))
+        prompt = build_prompt(generator, self.json_body())
+
+        if self.get_query_argument("stream", "0") not in ("1", "true"):
+            self.write_json({"insight": await self.run(generator.generate, prompt)})
+            return
+
+        self.set_header("Content-Type", "text/plain; charset=utf-8")
+        chunks = generator.generate_stream(prompt)
+        while True:
+            chunk = await self.run(next, chunks, None)
+            if chunk is None:
+                break
+            self.write(chunk)
+            await self.flush()
+        self.finish()
+
+
+class InsightBatchHandler(BaseHandler):
+    async def post(self):
+        requests = self.json_body().get("requests") or []
+        if not isinstance(requests, list) or not requests or len(requests) > MAX_BATCH:
+            raise tornado.web.HTTPError(400, reason=f"'requests' must hold 1-{MAX_BATCH} items")
+        if not all(isinstance(request, dict) and isinstance(request.get("input") or {}, dict)
+                   for request in requests):
+            raise tornado.web.HTTPError(400, reason="Each request must be an object with an object 'input'")
+        provider = self.get_query_argument("provider", "gemini")
+        generators, prompts = {}, []
+        for request in requests:
+            kind = request.get("kind")
+            if kind not in INSIGHT_GENERATORS:
+                raise tornado.web.HTTPError(400, reason=f"Unknown insight kind '{kind}'")
+            generator_class, build_prompt = INSIGHT_GENERATORS[kind]
+            if kind not in generators:
+                generators[kind] = generator_class(provider)
+            prompts.append(build_prompt(generators[kind], request.get("input") or {}))
+
+        # One rate-limited, coalesced, cached fan-out for the whole batch
+        engine = AIEngine(provider)
+        self.write_json({"insights": await engine.generate_many(prompts)})
+
+
+def make_app():
+    return tornado.web.Application([
+        (r"/health", HealthHandler),
+        (r"/v1/traces", TracesHandler),
+        (r"/v1/data", DataHandler),
+        (r"/v1/image", ImageHandler),
+        (r"/v1/text", TextHandler),
+        (r"/v1/text/batch", TextBatchHandler),
+        (r"/v1/insights/batch", InsightBatchHandler),
+        (r"/v1/insights/(\w+)", InsightHandler),
+    ])
+
+
+def start_background(port=0, host="127.0.0.1"):
+    """Serve on a daemon thread (for tests and load runs); returns the bound port"""
+    import threading
+    sockets = tornado.netutil.bind_sockets(port, host)
+    bound = sockets[0].getsockname()[1]
+
+    async def serve():
+        tornado.httpserver.HTTPServer(make_app()).add_sockets(sockets)
+        await asyncio.Event().wait()
+
+    threading.Thread(target=asyncio.run, args=(serve(),), daemon=True).start()
+    return bound
+
+
+async def main(port, host):
+    make_app().listen(port, host, max_body_size=Config.MAX_FILE_SIZE)
+    print(f"🚀 Smart Insight API listening on http://{host}:{port}")
+    await asyncio.Event().wait()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Smart Insight Engine HTTP API")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--host", default="127.0.0.1")
+    args = parser.parse_args()
+    asyncio.run(main(args.port, args.host))
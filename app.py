@@ -1,15 +1,19 @@
 import streamlit as st
-import pandas as pd
-import plotly.express as px
-from PIL import Image
-import os, sys
+import sys, json
 
 # Load modules
+# Only the shared core is imported here; each analysis mode imports its own
+# (heavier) dependencies when it is first opened
 sys.path.append("modules")
-from data_analyzer import DataAnalyzer
-from text_analyzer import TextAnalyzer
-from image_analyzer import ImageAnalyzer
-from ai_engine import DataInsightGenerator, TextInsightGenerator, ImageInsightGenerator
+from import_timer import timed_imports, import_report
+# Same module object the analyzers record spans into (they import it via modules.)
+from modules.instrumentation import RECENT_TRACES, trace
+with timed_imports("core"):
+    from config import Config
+    from result_memo import ResultMemo, content_digest
+    from upload_store import UploadStore
+    from jobs import ACTIVE_STATES, JobManager
+    from ai_engine import DataInsightGenerator, TextInsightGenerator, ImageInsightGenerator, RESPONSE_CACHE, SINGLE_FLIGHT, AI_METRICS
 
 
 # ===========================
@@ -42,12 +46,172 @@ with st.sidebar:
     ai_provider = st.selectbox("AI Engine", ["Mock (Free)", "Google Gemini"])
     provider_map = {"Mock (Free)": "mock", "Google Gemini": "gemini"}
 
+    cache = RESPONSE_CACHE.stats()
+    st.caption(f"AI cache: {cache['memory_hits'] + cache['disk_hits']} hits · "
+               f"{cache['misses']} misses · "
+               f"{SINGLE_FLIGHT.stats()['deduplicated']} coalesced")
+
+    st.markdown("---")
+    save_uploads = st.checkbox("Keep a copy of uploads", True,
+                               help="Stored in uploads/ in the background (deduplicated, oldest evicted "
+                                    "past the quota); analysis reads from memory")
+    profile_mode = st.selectbox("Profile analyses", ["Off", "CPU", "Memory"],
+                                help="cProfile or tracemalloc around each new analysis; "
+                                     "results appear under Diagnostics")
+    profile_map = {"Off": "", "CPU": "cpu", "Memory": "memory"}
+
     st.markdown("<hr>", unsafe_allow_html=True)
 
 
 # ===========================
 # 🤖 Helper
 # ===========================
+# Data preview / statistics window
+ROWS_PER_PAGE = 50
+COLUMNS_PER_PAGE = 20
+
+
+@st.cache_resource
+def image_history():
+    # Shared across sessions; re-uploads reuse earlier image analyses
+    from image_hash import DuplicateIndex
+    return DuplicateIndex("outputs/image_history.jsonl")
+
+
+@st.cache_resource
+def result_memo():
+    # Shared across reruns and sessions, keyed by upload content hash
+    return ResultMemo(max_bytes=512 * 1024 ** 2)
+
+
+@st.cache_resource
+def upload_store():
+    # Content-addressed, so re-uploads and same-named files don't collide
+    return UploadStore(Config.UPLOAD_FOLDER, Config.MAX_FILE_SIZE, Config.UPLOAD_QUOTA_BYTES)
+
+
+@st.cache_resource
+def job_manager():
+    # Long analyses run here so the script thread stays responsive
+    return JobManager(max_workers=2)
+
+
+def memoized(kind, digest, compute, *params):
+    return result_memo().get_or_compute((kind, digest) + params, compute)
+
+
+@st.fragment(run_every=0.5)
+def job_progress(job_id):
+    """Live progress, partial results and a cancel button for one job"""
+    job = job_manager().get(job_id)
+    state = job.snapshot()
+    if state["status"] not in ACTIVE_STATES:
+        st.rerun()  # full run renders the finished result
+
+    st.progress(state["progress"],
+                text=f"⏳ {state['step'].replace('_', ' ')} · {state['elapsed_seconds']:.0f}s")
+    if state["partial"]:
+        with st.expander("Partial results"):
+            st.json(state["partial"], expanded=False)
+    if st.button("Cancel", key=f"cancel-{job_id}"):
+        job.cancel()
+
+
+def in_background(kind, digest, work, *args):
+    """
+    Memoized result of work(job, *args), computed as a background job
+
+    Returns None while the job runs (a live progress panel is shown
+    instead) or after it failed or was cancelled. The memo holds the
+    result; the job keeps it only if the memo refused it as too large,
+    and a job whose result has since been dropped is run again.
+    """
+    key = (kind, digest)
+    memo = result_memo()
+    missing = object()
+    result = memo.get(key, missing)
+    if result is not missing:
+        return result
+
+    jobs = st.session_state.setdefault("jobs", {})
+    job = job_manager().get(jobs.get(key, ""))
+    if job is None or (job.status == "done" and job.result is None):
+        profile = profile_map[profile_mode]
+
+        def run(job):
+            with trace(kind, profile=profile):
+                result = memo.put(key, work(job, *args))
+            return None if key in memo else result
+
+        jobs[key] = job_manager().submit(kind, run)
+        job = job_manager().get(jobs[key])
+
+    if job.status in ACTIVE_STATES:
+        job_progress(job.id)
+        return None
+    if job.status == "done":
+        return job.result  # too large for the memo
+
+    st.warning(f"Analysis {job.status}" + (f": {job.error}" if job.error else ""))
+    if st.button("Retry", key=f"retry-{job.id}"):
+        del jobs[key]
+        st.rerun()
+    return None
+
+
+def load_csv(job, file):
+    # Parsed straight from the upload's bytes; the disk copy is optional
+    if save_uploads:
+        upload_store().put_async(file)
+    analyzer = DataAnalyzer(file, name=file.name)
+    if not analyzer.load_data(progress=lambda fraction: job.report("parsing", fraction)):
+        raise ValueError(f"Could not parse {file.name} as CSV")
+    return analyzer
+
+
+def analyze_text(job, text):
+    job.report("tokenizing", 0.0)
+    analyzer = TextAnalyzer(text)
+    steps = [
+        ("stats", analyzer.get_basic_stats),
+        ("sentiment", analyzer.sentiment_analysis),
+        ("keywords", lambda: analyzer.extract_keywords(15)),
+        ("summary", lambda: analyzer.extractive_summary(3))
+    ]
+    results = {}
+    for i, (name, step) in enumerate(steps):
+        job.report(name, (i + 1) / (len(steps) + 1), **results)
+        results[name] = step()
+    return results
+
+
+def analyze_image(job, file, history):
+    if save_uploads:
+        upload_store().put_async(file)
+    results = ImageAnalyzer(file, name=file.name).full_analysis(history=history, progress=job.report)
+    if results is None:
+        raise ValueError(f"Could not decode {file.name}")
+    return results
+
+
+def page_window(key, total, page_size, label):
+    """Page picker shown only when total doesn't fit; returns (start, end)"""
+    pages = max(1, -(-total // page_size))
+    page = 1
+    if pages > 1:
+        page = st.number_input(f"{label} page (of {pages})", 1, pages, 1, key=key)
+    start = (page - 1) * page_size
+    return start, min(total, start + page_size)
+
+
+def within_size_limit(file):
+    if file.size <= Config.MAX_FILE_SIZE:
+        return True
+    st.error(f"{file.name} is {file.size / 1024**2:.1f} MB; the limit is "
+             f"{Config.MAX_FILE_SIZE / 1024**2:.0f} MB")
+    return False
+
+
 def run_ai(gen, content):
     with st.spinner("AI Thinking..."):
         try:
@@ -61,105 +225,199 @@ def run_ai(gen, content):
 # 📊 DATA ANALYSIS
 # ===========================
 if "Data Analysis" in mode:
+    with timed_imports("data"):
+        import plotly.express as px
+        from data_analyzer import DataAnalyzer
 
     st.subheader("📂 Upload CSV File")
     file = st.file_uploader(" ", type="csv")
 
-    if file:
-        path = f"uploads/{file.name}"
-        os.makedirs("uploads", exist_ok=True)
-        with open(path, "wb") as f: f.write(file.getbuffer())
+    if file and within_size_limit(file):
+        digest = content_digest(file.getvalue())
+        analyzer = in_background("csv", digest, load_csv, file)
 
-        analyzer = DataAnalyzer(path)
-
-        if analyzer.load_data():
+        if analyzer is not None:
             df = analyzer.df
 
             # Metrics section
             st.markdown("### 📈 Dataset Overview")
+            missing, size_mb = memoized("overview", digest, lambda: (
+                int(df.isnull().sum().sum()), df.memory_usage().sum() / 1024**2
+            ))
             col1, col2, col3, col4 = st.columns(4)
             col1.metric("Rows", len(df))
             col2.metric("Columns", len(df.columns))
-            col3.metric("Missing", df.isnull().sum().sum())
-            col4.metric("Size", f"{df.memory_usage().sum()/1024**2:.2f} MB")
+            col3.metric("Missing", missing)
+            col4.metric("Size", f"{size_mb:.2f} MB")
 
             tab1, tab2, tab3, tab4 = st.tabs(
                 ["📋 Preview", "📊 Statistics", "📈 Visualization", "🤖 AI Insights"]
             )
 
+            # Only the visible window is sliced and rendered; column
+            # statistics are computed per page and memoized per column
             with tab1:
-                st.dataframe(df.head())
+                left, right = st.columns(2)
+                with left:
+                    row_start, row_end = page_window("preview-rows", len(df), ROWS_PER_PAGE, "Row")
+                with right:
+                    col_start, col_end = page_window("preview-cols", len(df.columns), COLUMNS_PER_PAGE, "Column")
+                st.dataframe(analyzer.get_window(row_start, ROWS_PER_PAGE, col_start, COLUMNS_PER_PAGE))
+                st.caption(f"Rows {row_start + 1}–{row_end} of {len(df)} · "
+                           f"columns {col_start + 1}–{col_end} of {len(df.columns)}")
 
             with tab2:
-                st.dataframe(df.describe())
+                col_start, col_end = page_window("stats-cols", len(df.columns), COLUMNS_PER_PAGE, "Column")
+                def column_stats(col):
+                    return memoized("column_stats", digest, lambda: analyzer.column_stats(col), col)
+
+                st.dataframe(analyzer.get_statistics_page(col_start, COLUMNS_PER_PAGE, column_stats))
+                st.caption(f"Columns {col_start + 1}–{col_end} of {len(df.columns)}")
 
             with tab3:
                 nums = df.select_dtypes("number").columns
                 if len(nums) > 0:
                     col = st.selectbox("Choose Column", nums)
-                    st.plotly_chart(px.histogram(df, x=col))
+                    st.plotly_chart(memoized("histogram", digest, lambda: px.histogram(df, x=col), col))
 
             with tab4:
                 if use_ai and st.button("Generate Insights"):
-                    info = analyzer.get_info()
+                    info = memoized("ai_summary", digest, analyzer.get_ai_summary)
                     ai = DataInsightGenerator(provider_map[ai_provider])
-                    st.info(ai.analyze_dataset(info))
+                    st.write_stream(ai.analyze_dataset(info, stream=True))
 
 
 # ===========================
 # 📝 TEXT ANALYSIS
 # ===========================
 elif "Text Analysis" in mode:
+    with timed_imports("text"):
+        from text_analyzer import TextAnalyzer
 
     st.subheader("📝 Enter Text")
     text = st.text_area("", height=200)
 
+    digest = content_digest(text)
     if len(text) > 10 and st.button("Analyze Text"):
-        analyzer = TextAnalyzer(text)
+        st.session_state["analyzed_text"] = digest
 
+    # Stays visible across reruns (e.g. clicking "AI Enhance") until the text changes
+    results = None
+    if len(text) > 10 and st.session_state.get("analyzed_text") == digest:
+        results = in_background("text", digest, analyze_text, text)
+
+    if results:
         tab1, tab2, tab3, tab4 = st.tabs(
             ["📊 Statistics", "😊 Sentiment", "🔑 Keywords", "🤖 AI Insights"]
         )
 
-        with tab1: st.write(analyzer.get_basic_stats())
-        with tab2: st.write(analyzer.sentiment_analysis())
-        with tab3: st.write(analyzer.extract_keywords(15))
+        with tab1: st.write(results["stats"])
+        with tab2: st.write(results["sentiment"])
+        with tab3: st.write(results["keywords"])
 
         with tab4:
             if use_ai and st.button("AI Enhance"):
                 ai = TextInsightGenerator(provider_map[ai_provider])
-                summary = analyzer.extractive_summary(3)
-                st.info(ai.enhance_summary(text, summary))
+                # most_common order, so the first 10 of 15 are the top 10
+                keywords = results["keywords"][:10]
+                st.write_stream(ai.enhance_summary(text, results["summary"], keywords, stream=True))
 
 
 # ===========================
 # 🖼️ IMAGE ANALYSIS
 # ===========================
 elif "Image Analysis" in mode:
+    with timed_imports("image"):
+        from image_analyzer import ImageAnalyzer
 
     st.subheader("🖼️ Upload Image")
     file = st.file_uploader(" ", type=["png", "jpg", "jpeg"])
 
-    if file:
-        img = Image.open(file)
-        st.image(img, use_column_width=True)
-
-        path = f"uploads/{file.name}"
-        img.save(path)
+    if file and within_size_limit(file):
+        digest = content_digest(file.getvalue())
+        # Encoded bytes go to the browser as-is (no decode/re-encode)
+        st.image(file.getvalue(), use_column_width=True)
 
         if st.button("Analyze Image"):
-            analyzer = ImageAnalyzer(path)
-            results = analyzer.full_analysis()
+            st.session_state["analyzed_image"] = digest
+
+        results = None
+        if st.session_state.get("analyzed_image") == digest:
+            results = in_background("image", digest, analyze_image, file, image_history())
+
+        if results:
+            if results.get("duplicate_of"):
+                st.info(f"♻️ Matched an earlier upload ({results['duplicate_of']['path']}), "
+                        "showing its saved analysis.")
 
             tab1, tab2, tab3 = st.tabs(["📋 Metadata", "🎨 Colors", "🤖 AI Insights"])
 
             with tab1: st.json(results["metadata"])
-            with tab2: st.json(results["color_analysis"])
+            with tab2:
+                colors = results["color_analysis"]
+                st.json({k: v for k, v in colors.items()
+                         if k not in ("channel_histograms", "color_histogram")})
+                st.line_chart(colors["channel_histograms"])
+                if results["palette"]:
+                    st.markdown("**Dominant Colors**")
+                    for swatch, color in zip(st.columns(len(results["palette"])), results["palette"]):
+                        swatch.markdown(
+                            f"<div style='background:{color['hex']}; height:40px; border-radius:6px;'></div>",
+                            unsafe_allow_html=True
+                        )
+                        swatch.caption(f"{color['hex']} · {color['coverage']:.0%}")
 
             with tab3:
                 if use_ai and st.button("AI Vision Insights"):
                     ai = ImageInsightGenerator(provider_map[ai_provider])
-                    st.info(ai.interpret_image_analysis(results))
+                    st.write_stream(ai.interpret_image_analysis(results, stream=True))
+
+
+# ===========================
+# 🩺 DIAGNOSTICS
+# ===========================
+# Rendered last so it includes the calls made during this run
+with st.sidebar:
+    with st.expander("🩺 Diagnostics"):
+        memo = result_memo().stats()
+        st.caption(f"Result memo: {memo['entries']} entries · {memo['megabytes']} MB · "
+                   f"{memo['hits']} hits · {memo['misses']} misses")
+        stored = upload_store().stats()
+        st.caption(f"Uploads: {stored['files']} files · {stored['megabytes']} / "
+                   f"{stored['quota_megabytes']} MB · {stored['deduplicated']} deduplicated · "
+                   f"{stored['evicted']} evicted")
+        metrics = AI_METRICS.to_json()
+        if not metrics['requests']:
+            st.caption("No AI calls yet.")
+        else:
+            st.dataframe(metrics['requests'], hide_index=True)
+            st.dataframe([
+                {"provider": h["provider"], "cache": h["cache"], "calls": h["count"],
+                 "p50 (s)": h["p50"], "p95 (s)": h["p95"], "ttfb p95 (s)": t["p95"]}
+                for h, t in zip(metrics['latency_seconds'], metrics['ttfb_seconds'])
+            ], hide_index=True)
+            st.caption(f"Retries: {metrics['retries']} · hedges: {metrics['hedges']} · "
+                       f"est. cost: ${metrics['estimated_cost_usd']:.4f}")
+            st.markdown("**Slowest recent calls**")
+            st.dataframe(AI_METRICS.slowest(5), hide_index=True, column_order=[
+                "latency_seconds", "ttfb_seconds", "cache", "prompt_tokens", "response_tokens", "prompt"
+            ])
+        if RECENT_TRACES:
+            latest = RECENT_TRACES[-1]
+            st.markdown(f"**Last analysis: {latest['name']}** · {latest['seconds']:.2f}s"
+                        + (f" · peak {latest['peak_mb']:.1f} MB" if latest['peak_mb'] is not None else ""))
+            st.dataframe(latest['spans'], hide_index=True,
+                         column_order=["name", "calls", "seconds", "share", "allocated_mb"])
+            if latest['hotspots']:
+                st.dataframe(latest['hotspots'], hide_index=True)
+        st.caption("Cold imports: " + " · ".join(
+            f"{t['group']} {t['seconds']:.2f}s ({t['modules']} modules)" for t in import_report()
+        ))
+        prom_col, json_col = st.columns(2)
+        prom_col.download_button("Prometheus", AI_METRICS.to_prometheus(),
+                                 file_name="ai_metrics.prom", mime="text/plain")
+        json_col.download_button("JSON", json.dumps(AI_METRICS.to_json(), indent=2),
+                                 file_name="ai_metrics.json", mime="application/json")
 
 
 # Footer
@@ -0,0 +1,304 @@
+"""
+Benchmark suite for the analyzers and the AI engine (mock mode, offline)
+
+    python benchmarks/run.py                       # quick profile, compare to baseline
+    python benchmarks/run.py --only data,image     # case name prefixes
+    python benchmarks/run.py --profile full        # 10M rows, 100 MB text, 100 MP images
+    python benchmarks/run.py --save-baseline       # record benchmarks/baselines/<profile>.json
+
+Each case is timed (best of --repeat runs), then run once more under
+tracemalloc for peak Python/NumPy memory (allocations inside OpenCV and
+pandas' C parser are not seen). Process-wide result caches (the OCR cache)
+are cleared before every run, so each run does the full work. Results are compared with the stored
+baseline; a case regresses when it is more than --tolerance slower or
+larger, beyond a small absolute noise floor. Exits 1 on regressions, on
+cases that fail to run and on cases with no baseline, so nothing goes
+unguarded. Failed cases are never recorded in a baseline. Suites whose
+data isn't installed (the text cases need the NLTK data - see
+tests/download_nltk_data.py) are skipped with a warning instead.
+Baselines are machine-specific: record them on the machine you compare on.
+"""
+import os
+import sys
+import json
+import time
+import asyncio
+import argparse
+import platform
+import tracemalloc
+from contextlib import redirect_stdout
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from benchmarks import synthetic
+from modules.data_analyzer import DataAnalyzer
+from modules.image_analyzer import ImageAnalyzer, OCR_CACHE, TESSERACT_AVAILABLE
+from modules.ai_engine import AIEngine, DataInsightGenerator
+
+BASELINE_DIR = os.path.join(ROOT, "benchmarks", "baselines")
+
+KB, MB = 1024, 1024 ** 2
+PROFILES = {
+    "quick": {"rows": [10_000, 100_000], "text_bytes": [1 * KB, 100 * KB],
+              "megapixels": [0.1, 1], "prompts": 200},
+    "full": {"rows": [10_000, 100_000, 1_000_000, 10_000_000],
+             "text_bytes": [1 * KB, 100 * KB, 1 * MB, 10 * MB, 100 * MB],
+             "megapixels": [0.1, 1, 10, 100], "prompts": 2000},
+}
+
+# Differences below these are noise, whatever the ratio
+MIN_SECONDS_DELTA = 0.01
+MIN_MEGABYTES_DELTA = 1.0
+
+
+def _size_label(n, units=((MB, "mb"), (KB, "kb"), (1, "b"))):
+    for size, suffix in units:
+        if n >= size:
+            return f"{n / size:g}{suffix}"
+    return str(n)
+
+
+# ===========================
+# Cases: (name, prepare); prepare() generates the inputs (untimed) and
+# returns the function to measure, so filtered-out cases cost nothing
+# ===========================
+def data_cases(rows_list):
+    def prepare(rows):
+        path = synthetic.csv_file(rows)
+
+        def run():
+            # What the app does for an upload: parse, AI summary, first stats page
+            analyzer = DataAnalyzer(path)
+            analyzer.load_data()
+            analyzer.get_ai_summary()
+            analyzer.get_statistics_page(0, 20)
+        return run
+
+    for rows in rows_list:
+        label = _size_label(rows, ((10 ** 6, "m"), (10 ** 3, "k"), (1, "")))
+        yield f"data.csv_{label}", lambda rows=rows: prepare(rows)
+
+
+def text_cases(sizes):
+    def prepare(size):
+        from modules.text_analyzer import TextAnalyzer
+        with open(synthetic.document_file(size), encoding="utf-8") as f:
+            text = f.read()
+
+        def run():
+            analyzer = TextAnalyzer(text)
+            analyzer.get_basic_stats()
+            analyzer.sentiment_analysis()
+            analyzer.extract_keywords(15)
+            analyzer.extractive_summary(3)
+        return run
+
+    for size in sizes:
+        yield f"text.doc_{_size_label(size)}", lambda size=size: prepare(size)
+
+
+def image_cases(megapixels_list):
+    def prepare(mp, ext="png", **options):
+        path = synthetic.image_file(mp, ext=ext)
+        return lambda: ImageAnalyzer(path, **options).full_analysis()
+
+    for mp in megapixels_list:
+        yield f"image.{mp:g}mp", lambda mp=mp: prepare(mp)
+        yield f"image.{mp:g}mp_preview", lambda mp=mp: prepare(mp, max_dimension=1024)
+        if mp >= 1:
+            # Uncompressed, so the tiled path memory-maps it
+            yield f"image.{mp:g}mp_tiled", lambda mp=mp: prepare(mp, "bmp", tile_size=1024)
+
+
+def ai_cases(prompts):
+    texts = [f"Summarize benchmark record {i}" for i in range(prompts)]
+
+    def engine_case(batch):
+        engine = AIEngine(provider="mock")
+        if batch:
+            return lambda: asyncio.run(engine.generate_many(texts))
+        return lambda: [engine.generate(text) for text in texts]
+
+    def prompt_case():
+        analyzer = DataAnalyzer(synthetic.csv_file(100_000))
+        analyzer.load_data()
+        summary = analyzer.get_ai_summary()
+        generator = DataInsightGenerator(provider="mock")
+        return lambda: [generator.dataset_prompt(summary) for _ in range(100)]
+
+    yield "ai.mock_generate", lambda: engine_case(batch=False)
+    yield "ai.mock_generate_many", lambda: engine_case(batch=True)
+    yield "ai.dataset_prompt", prompt_case
+
+
+def missing_nltk_data():
+    """NLTK resources the text cases need that aren't installed"""
+    import nltk
+    missing = []
+    for resource in ("tokenizers/punkt_tab", "corpora/stopwords"):
+        try:
+            nltk.data.find(resource)
+        except LookupError:
+            missing.append(resource.split("/")[1])
+    return missing
+
+
+SUITES = {"data": data_cases, "text": text_cases, "image": image_cases, "ai": ai_cases}
+SUITE_PARAMS = {"data": "rows", "text": "text_bytes", "image": "megapixels", "ai": "prompts"}
+# suite: (check returning what's missing, how to install it)
+SUITE_REQUIREMENTS = {"text": (missing_nltk_data, "python tests/download_nltk_data.py")}
+
+
+# ===========================
+# Measurement
+# ===========================
+def _error(e):
+    message = next((line.strip(" *") for line in str(e).splitlines() if line.strip(" *")), "")
+    return {"error": f"{type(e).__name__}: {message}"}
+
+
+def reset_caches():
+    """Forget memoized results, so repeated runs don't skip the work (e.g. Tesseract)"""
+    OCR_CACHE.clear()
+
+
+def measure(fn, repeat):
+    timings = []
+    for _ in range(repeat):
+        reset_caches()
+        started = time.perf_counter()
+        fn()
+        timings.append(time.perf_counter() - started)
+    reset_caches()
+    tracemalloc.start()
+    try:
+        fn()
+        peak = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+    return {
+        "seconds": round(min(timings), 4),
+        "mean_seconds": round(sum(timings) / len(timings), 4),
+        "peak_mb": round(peak / MB, 2)
+    }
+
+
+def run_suite(profile, only, repeat):
+    """Results by case name, and the names of suites skipped for missing data"""
+    params = PROFILES[profile]
+    results, skipped = {}, []
+    with open(os.devnull, "w") as quiet:
+        for suite, make_cases in SUITES.items():
+            cases = [(name, prepare) for name, prepare in make_cases(params[SUITE_PARAMS[suite]])
+                     if not only or any(name.startswith(p) for p in only)]
+            if cases and suite in SUITE_REQUIREMENTS:
+                check, install = SUITE_REQUIREMENTS[suite]
+                missing = check()
+                if missing:
+                    skipped.append(suite)
+                    print(f"  {suite + '.*':<28} ⏭ skipped, missing {', '.join(missing)} ({install})")
+                    continue
+            for name, prepare in cases:
+                try:
+                    with redirect_stdout(quiet):
+                        results[name] = measure(prepare(), repeat)
+                except Exception as e:
+                    results[name] = _error(e)
+                    print(f"  {name:<28} ✗ {results[name]['error']}")
+                    continue
+                r = results[name]
+                print(f"  {name:<28} {r['seconds']:>9.4f}s {r['peak_mb']:>9.2f} MB")
+    return results, skipped
+
+
+def compare(results, baseline, tolerance):
+    """Names of cases that got slower or bigger than baseline * (1 + tolerance)"""
+    regressions = []
+    for name, current in results.items():
+        before = baseline.get("results", {}).get(name)
+        if not before or "error" in current:
+            continue  # reported by main()
+        slower = (current["seconds"] > before["seconds"] * (1 + tolerance)
+                  and current["seconds"] - before["seconds"] > MIN_SECONDS_DELTA)
+        bigger = (current["peak_mb"] > before["peak_mb"] * (1 + tolerance)
+                  and current["peak_mb"] - before["peak_mb"] > MIN_MEGABYTES_DELTA)
+        if slower or bigger:
+            regressions.append(name)
+            print(f"  ❌ {name}: {before['seconds']}s → {current['seconds']}s, "
+                  f"{before['peak_mb']} → {current['peak_mb']} MB")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Smart Insight Engine benchmarks")
+    parser.add_argument("--profile", choices=PROFILES, default="quick")
+    parser.add_argument("--only", default="", help="comma-separated case name prefixes")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--tolerance", type=float, default=0.5, help="allowed slowdown, 0.5 = 50%%")
+    parser.add_argument("--save-baseline", action="store_true")
+    parser.add_argument("--output", help="also write results JSON here")
+    args = parser.parse_args()
+
+    only = [p for p in args.only.split(",") if p]
+    print(f"🏁 Benchmarks ({args.profile} profile)")
+    results, skipped = run_suite(args.profile, only, args.repeat)
+    report = {
+        "meta": {
+            "profile": args.profile,
+            "python": platform.python_version(),
+            "machine": platform.machine(),
+            "cpus": os.cpu_count(),
+            "tesseract": TESSERACT_AVAILABLE,
+            "created": time.strftime("%Y-%m-%dT%H:%M:%S")
+        },
+        "results": results
+    }
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+
+    failed = [name for name, result in report["results"].items() if "error" in result]
+    measured = {name: result for name, result in report["results"].items() if "error" not in result}
+
+    if skipped:
+        print(f"⚠️ Not measured on this machine: {', '.join(s + '.*' for s in skipped)}")
+
+    baseline_path = os.path.join(BASELINE_DIR, f"{args.profile}.json")
+    if args.save_baseline:
+        baseline = {"meta": report["meta"], "results": {}}
+        if os.path.exists(baseline_path) and only:
+            with open(baseline_path) as f:
+                baseline = json.load(f)  # --only updates just those cases
+        baseline["meta"] = report["meta"]
+        baseline["results"].update(measured)
+        os.makedirs(BASELINE_DIR, exist_ok=True)
+        with open(baseline_path, "w") as f:
+            json.dump(baseline, f, indent=2, sort_keys=True)
+        print(f"✓ Baseline saved: {baseline_path}")
+        if failed:
+            print(f"❌ Not recorded, failed to run: {', '.join(failed)}")
+            sys.exit(1)
+        return
+
+    if not os.path.exists(baseline_path):
+        print("ℹ️ No baseline yet; run with --save-baseline to record one")
+        sys.exit(1 if failed else 0)
+    with open(baseline_path) as f:
+        baseline = json.load(f)
+    if baseline["meta"].get("tesseract") != report["meta"]["tesseract"]:
+        print("⚠️ Tesseract availability differs from the baseline; image timings aren't comparable")
+    regressions = compare(measured, baseline, args.tolerance)
+    unguarded = [name for name in measured if name not in baseline.get("results", {})]
+    if failed:
+        print(f"❌ Failed to run: {', '.join(failed)}")
+    if unguarded:
+        print(f"❌ No baseline for: {', '.join(unguarded)} (record with --save-baseline --only ...)")
+    if regressions or failed or unguarded:
+        sys.exit(1)
+    print("✓ No regressions against baseline")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,126 @@
+"""
+Deterministic synthetic inputs for the benchmarks
+
+Every generator is seeded, so the same parameters always produce the
+same bytes. Files are written once to CACHE_DIR and reused, since the
+large sizes (10M-row CSVs, 100 MB documents, 100 MP images) take longer
+to generate than to analyze.
+"""
+import os
+
+import cv2
+import numpy as np
+import pandas as pd
+
+CACHE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), ".cache")
+
+CSV_CHUNK_ROWS = 250_000
+REGIONS = np.array(["north", "south", "east", "west", "central"])
+# Most frequent first; word i is drawn with probability proportional to 1/(i+1)
+WORDS = np.array("""
+the of and to a in is for on was with by as are from at be has will have were
+data report revenue growth customer market team product quarter sales value
+strong weak good poor great slow fast new old first last high low better worse
+analysis insight trend pattern signal noise model forecast result process system
+increase decrease improve decline expand reduce launch deliver support review
+region service quality price cost margin budget target goal plan strategy risk
+""".split())
+WORD_WEIGHTS = 1 / np.arange(1, len(WORDS) + 1)
+WORD_WEIGHTS /= WORD_WEIGHTS.sum()
+
+
+def _cached(name, write):
+    os.makedirs(CACHE_DIR, exist_ok=True)
+    path = os.path.join(CACHE_DIR, name)
+    if not os.path.exists(path):
+        tmp_path = f"{path}.tmp"
+        write(tmp_path)
+        os.replace(tmp_path, path)
+    return path
+
+
+def csv_file(rows, seed=0):
+    """Mixed-type CSV (ids, dates, categories, floats with gaps, bools)"""
+
+    def write(path):
+        for start in range(0, rows, CSV_CHUNK_ROWS):
+            n = min(CSV_CHUNK_ROWS, rows - start)
+            rng = np.random.default_rng((seed, start))
+            rating = rng.uniform(1, 5, n).round(1)
+            rating[rng.random(n) < 0.02] = np.nan
+            pd.DataFrame({
+                "id": np.arange(start, start + n),
+                "date": (np.datetime64("2020-01-01") + rng.integers(0, 1500, n)).astype(str),
+                "region": REGIONS[rng.integers(0, len(REGIONS), n)],
+                "price": rng.lognormal(4, 0.5, n).round(2),
+                "quantity": rng.poisson(12, n),
+                "rating": rating,
+                "returned": rng.random(n) < 0.05,
+                "score": rng.normal(0, 1, n).round(4)
+            }).to_csv(path, mode="a", header=start == 0, index=False)
+
+    return _cached(f"data_{rows}_{seed}.csv", write)
+
+
+def document(size_bytes, seed=0):
+    """English-like text of about size_bytes: Zipf-distributed words in sentences"""
+    rng = np.random.default_rng(seed)
+    parts, written = [], 0
+    while written < size_bytes:
+        lengths = rng.integers(6, 20, 2000)
+        words = rng.choice(WORDS, lengths.sum(), p=WORD_WEIGHTS)
+        ends = np.cumsum(lengths)
+        for begin, end in zip(ends - lengths, ends):
+            sentence = " ".join(words[begin:end])
+            parts.append(sentence[0].upper() + sentence[1:] + ".")
+            written += len(parts[-1]) + 1
+            if written >= size_bytes:
+                break
+    return " ".join(parts)[:size_bytes]
+
+
+def document_file(size_bytes, seed=0):
+    def write(path):
+        with open(path, "w", encoding="utf-8") as f:
+            f.write(document(size_bytes, seed))
+
+    return _cached(f"text_{size_bytes}_{seed}.txt", write)
+
+
+def image(megapixels, seed=0):
+    """4:3 BGR image of about `megapixels` MP: gradient, shapes and fine texture"""
+    rng = np.random.default_rng(seed)
+    height = max(8, int((megapixels * 1e6 * 3 / 4) ** 0.5))
+    width = max(8, int(height * 4 / 3))
+    x = np.linspace(0, 255, width, dtype=np.float32)
+    y = np.linspace(0, 255, height, dtype=np.float32)[:, None]
+    img = np.empty((height, width, 3), np.uint8)
+    img[..., 0] = x
+    img[..., 1] = y
+    img[..., 2] = (x + y) / 2
+    scale = max(height, width)
+    for _ in range(40):
+        color = tuple(int(c) for c in rng.integers(0, 256, 3))
+        center = (int(rng.integers(0, width)), int(rng.integers(0, height)))
+        if rng.random() < 0.5:
+            cv2.circle(img, center, int(rng.integers(scale // 50, scale // 6)), color, -1)
+        else:
+            size = rng.integers(scale // 40, scale // 5, 2)
+            cv2.rectangle(img, center, (center[0] + int(size[0]), center[1] + int(size[1])), color, -1)
+    # Tileable noise, added in bands so the int16 temporary stays small
+    noise = np.tile(rng.integers(-12, 13, (256, 256, 1), dtype=np.int16), (1, -(-width // 256), 1))
+    for top in range(0, height, 256):
+        band = img[top:top + 256]
+        band[:] = np.clip(band + noise[:len(band), :width], 0, 255)
+    return img
+
+
+def image_file(megapixels, seed=0, ext="png"):
+    """Image written as PNG (compressed) or BMP (uncompressed, memory-mappable)"""
+
+    def write(path):
+        ok, encoded = cv2.imencode(f".{ext}", image(megapixels, seed))
+        with open(path, "wb") as f:
+            f.write(encoded.data)
+
+    return _cached(f"image_{megapixels}mp_{seed}.{ext}", write)
@@ -13,6 +13,7 @@ class Config:
     # File Upload Settings
     UPLOAD_FOLDER = 'uploads'
     MAX_FILE_SIZE = 16 * 1024 * 1024  # 16MB
+    UPLOAD_QUOTA_BYTES = 1024 * 1024 * 1024  # 1GB; least recently used uploads are evicted
     
     # AI Settings
     AI_MODEL_GEMINI = 'gemini-2.0-flash-lite'
@@ -1,71 +1,410 @@
+import os
 import json
-from typing import Dict
+import time
+import asyncio
+import importlib.util
+from concurrent.futures import ThreadPoolExecutor
+from threading import Lock
+from typing import Dict, Iterator, List, Optional, Union
 
-# Try importing Gemini
 try:
-    import google.generativeai as genai
-    GEMINI_AVAILABLE = True
-except ImportError:
+    from modules.response_cache import ResponseCache
+    from modules.rate_limiter import RateLimiter, estimate_tokens
+    from modules.prompt_builder import PromptBuilder
+    from modules.single_flight import SingleFlight
+    from modules.resilient_client import CircuitBreaker, CircuitOpenError, LatencyTracker, ResilientClient
+    from modules.gemini_rest import GeminiRestModel
+    from modules.ai_metrics import AIMetrics
+    from modules.instrumentation import say, set_verbose
+except ImportError:  # running as a script from inside modules/
+    from response_cache import ResponseCache
+    from rate_limiter import RateLimiter, estimate_tokens
+    from prompt_builder import PromptBuilder
+    from single_flight import SingleFlight
+    from resilient_client import CircuitBreaker, CircuitOpenError, LatencyTracker, ResilientClient
+    from gemini_rest import GeminiRestModel
+    from ai_metrics import AIMetrics
+    from instrumentation import say, set_verbose
+
+# Check for Gemini; the SDK itself is slow to import, so it is only
+# imported once a client actually needs it
+try:
+    GEMINI_AVAILABLE = importlib.util.find_spec("google.generativeai") is not None
+except ImportError:  # no google namespace package at all
     GEMINI_AVAILABLE = False
-    print("⚠️ Gemini not installed (pip install google-generativeai)")
+if not GEMINI_AVAILABLE:
+    say("⚠️ Gemini not installed (pip install google-generativeai)")
 
 
 # CONFIG
 class Config:
     GEMINI_API_KEY = ""
+    GEMINI_BASE_URL = os.getenv("GEMINI_BASE_URL", "")  # e.g. the local fake server
     AI_MODEL_GEMINI = "gemini-2.0-flash-lite"
     AI_MODEL_GEMINI = "gemini-2.0-flash-lite"
-    LAST_CALL = 0           
-    COOLDOWN_SECONDS = 2.0 
     TEMPERATURE = 0.7
     MAX_TOKENS = 1000
-
-
-class AIEngine:
+    REQUESTS_PER_SECOND = 0.5      # one call every 2s (free-tier RPM)
+    TOKENS_PER_MINUTE = 1_000_000
+    MAX_CONCURRENT_REQUESTS = 8
+    REQUEST_TIMEOUT_SECONDS = 30.0
+    STREAM_FIRST_CHUNK_SECONDS = 15.0  # streamed calls: time to first chunk, retries included
+    STREAM_IDLE_SECONDS = 10.0         # and the longest gap between chunks
+    MAX_RETRIES = 2
+    RETRY_BACKOFF_SECONDS = 0.5
+    HEDGE_REQUESTS = True          # duplicate calls slower than the observed p95
+    BREAKER_FAILURE_THRESHOLD = 5
+    BREAKER_RESET_SECONDS = 30.0
+    MOCK_STREAM_DELAY = 0.03       # seconds between simulated chunks
+    PROMPT_TOKEN_BUDGET = 800      # max prompt size for the insight generators
+    INPUT_COST_PER_1K_TOKENS = 0.000075   # USD, gemini-2.0-flash-lite list price
+    OUTPUT_COST_PER_1K_TOKENS = 0.0003
+    CACHE_DIR = "outputs/ai_cache"
+    CACHE_MAX_ENTRIES = 256
+    CACHE_TTL_SECONDS = 24 * 3600
+    CACHE_DISK_MAX_ENTRIES = 10_000  # files in CACHE_DIR, oldest removed first
+
+
+# Shared by every engine in the process, so new generators reuse responses
+RESPONSE_CACHE = ResponseCache(
+    cache_dir=Config.CACHE_DIR,
+    max_entries=Config.CACHE_MAX_ENTRIES,
+    ttl_seconds=Config.CACHE_TTL_SECONDS,
+    max_disk_entries=Config.CACHE_DISK_MAX_ENTRIES
+)
+
+# One budget per process - the API quota is per key, not per engine
+RATE_LIMITER = RateLimiter(Config.REQUESTS_PER_SECOND, Config.TOKENS_PER_MINUTE)
+
+# Identical prompts in flight at the same time share one upstream request
+SINGLE_FLIGHT = SingleFlight()
+
+# Upstream health and latency are properties of the API, not of one engine
+GEMINI_BREAKER = CircuitBreaker(Config.BREAKER_FAILURE_THRESHOLD, Config.BREAKER_RESET_SECONDS)
+GEMINI_LATENCY = LatencyTracker()
+
+# Per-call latency, token and cache measurements for every engine
+AI_METRICS = AIMetrics(Config.INPUT_COST_PER_1K_TOKENS, Config.OUTPUT_COST_PER_1K_TOKENS)
+
+
+# genai.configure() is process-wide, so only one API key can use the SDK;
+# clients for any other key use the REST client, which carries its own key
+GOOGLE_API_URL = "https://generativelanguage.googleapis.com"
+_SDK_KEY = None
+_SDK_LOCK = Lock()
+
+
+def _sdk_model(api_key):
+    """SDK model for api_key, or None if the SDK is configured with another key"""
+    global _SDK_KEY
+    with _SDK_LOCK:
+        if _SDK_KEY not in (None, api_key):
+            return None
+        import google.generativeai as genai
+        genai.configure(api_key=api_key)
+        _SDK_KEY = api_key
+        return genai.GenerativeModel(Config.AI_MODEL_GEMINI)
+
+
+class AIClient:
     """
-    AI-powered insight generator
-    Supports: Google Gemini and Mock mode
+    Configured model handle and resilience policy for one provider/key
+
+    Built once per process by CLIENT_POOL and shared by every engine, so
+    genai.configure, model construction and HTTP connections are reused
+    instead of repeated on every button click.
     """
 
     def __init__(self, provider='gemini', api_key=Config.GEMINI_API_KEY):
         self.provider = provider.lower()
         self.mock_mode = False
+        self.model = None
 
-        print("\n🤖 Initializing AI Engine (Gemini Only)...")
+        say("\n🤖 Initializing AI Engine (Gemini Only)...")
 
         if self.provider == "gemini":
-            if not GEMINI_AVAILABLE:
-                print("   ❌ Gemini library missing → switching to mock mode")
+            if Config.GEMINI_BASE_URL:
+                self.model = GeminiRestModel(
+                    Config.GEMINI_BASE_URL, api_key or Config.GEMINI_API_KEY or "local",
+                    Config.AI_MODEL_GEMINI, Config.TEMPERATURE, Config.MAX_TOKENS
+                )
+                say(f"   ✓ Gemini REST endpoint: {Config.GEMINI_BASE_URL}")
+            elif not GEMINI_AVAILABLE:
+                say("   ❌ Gemini library missing → switching to mock mode")
                 self.mock_mode = True
             else:
                 self.api_key = api_key or Config.GEMINI_API_KEY
                 if not self.api_key:
-                    print("   ❌ No Gemini API key → MOCK MODE enabled")
+                    say("   ❌ No Gemini API key → MOCK MODE enabled")
                     self.mock_mode = True
                 else:
-                    genai.configure(api_key=self.api_key)
-                    self.model = genai.GenerativeModel(Config.AI_MODEL_GEMINI)
-                    print("   ✓ Gemini configured successfully")
+                    self.model = _sdk_model(self.api_key)
+                    if self.model is None:
+                        # The SDK already holds another key; talk REST with this one
+                        self.model = GeminiRestModel(
+                            GOOGLE_API_URL, self.api_key, Config.AI_MODEL_GEMINI,
+                            Config.TEMPERATURE, Config.MAX_TOKENS
+                        )
+                    say("   ✓ Gemini configured successfully")
 
         else:
-            print("   ❌ Only Gemini supported → MOCK MODE enabled")
+            say("   ❌ Only Gemini supported → MOCK MODE enabled")
             self.mock_mode = True
 
         if self.mock_mode:
-            print("   ℹ️ Running in MOCK MODE (fake responses)\n")
+            say("   ℹ️ Running in MOCK MODE (fake responses)\n")
+
+        self.resilient = ResilientClient(
+            self.call,
+            retries=Config.MAX_RETRIES,
+            backoff=Config.RETRY_BACKOFF_SECONDS,
+            deadline=Config.REQUEST_TIMEOUT_SECONDS,
+            first_chunk_timeout=Config.STREAM_FIRST_CHUNK_SECONDS,
+            idle_timeout=Config.STREAM_IDLE_SECONDS,
+            hedge=Config.HEDGE_REQUESTS,
+            breaker=GEMINI_BREAKER,
+            latency=GEMINI_LATENCY
+        )
+
+    def call(self, prompt: str) -> str:
+        """Single API attempt; raises on failure"""
+        response = self.model.generate_content(prompt)
+        return response.text.strip()
+
+    def generate(self, prompt: str, stats: Optional[Dict] = None) -> str:
+        """Response text with retries, hedging and the breaker applied"""
+        return self.resilient.generate(prompt, stats)
+
+    def stream(self, prompt: str, stats: Optional[Dict] = None) -> Iterator:
+        """Response chunks, retried and hedged until the first one arrives, then idle-bounded"""
+        return self.resilient.stream(lambda: self.model.generate_content(prompt, stream=True), stats)
+
+
+class ClientPool:
+    """Thread-safe registry of AIClients keyed by provider, model, endpoint and key"""
+
+    def __init__(self):
+        self._clients = {}
+        self._lock = Lock()
+
+    def get(self, provider='gemini', api_key=Config.GEMINI_API_KEY) -> AIClient:
+        key = (provider.lower(), Config.AI_MODEL_GEMINI, Config.GEMINI_BASE_URL,
+               api_key or Config.GEMINI_API_KEY)
+        with self._lock:
+            client = self._clients.get(key)
+            if client is None:
+                client = self._clients[key] = AIClient(provider, api_key)
+            return client
+
+    def clear(self):
+        with self._lock:
+            self._clients.clear()
+
+    def __len__(self):
+        return len(self._clients)
+
+
+CLIENT_POOL = ClientPool()
+
+
+class AIEngine:
+    """
+    AI-powered insight generator
+    Supports: Google Gemini and Mock mode
+
+    Engines are cheap views over a pooled AIClient; they add response
+    caching, request coalescing and prompt construction.
+    """
+
+    def __init__(self, provider='gemini', api_key=Config.GEMINI_API_KEY, cache=RESPONSE_CACHE,
+                 pool=CLIENT_POOL):
+        self.client = pool.get(provider, api_key)
+        self.provider = self.client.provider
+        self.mock_mode = self.client.mock_mode
+        self.cache = cache
+
+    def generate(self, prompt: str, use_cache: bool = True) -> str:
+        record = AI_METRICS.start(self._provider_label(), prompt)
+        response = self._generate(prompt, use_cache, record)
+        AI_METRICS.finish(record, response)
+        return response
 
-    def generate(self, prompt: str) -> str:
+    def _generate(self, prompt: str, use_cache: bool, record) -> str:
         if self.mock_mode:
+            record.cache = 'bypass'
             return self._mock_response(prompt)
-        return self._call_gemini(prompt)
 
-    def _call_gemini(self, prompt: str) -> str:
-        """Real Gemini API call"""
+        key, cached = self._cache_lookup(prompt, use_cache)
+        if cached is not None:
+            record.cache = 'hit'
+            return cached
+
+        # Stays 'coalesced' unless this call turns out to be the leader
+        record.cache = 'coalesced'
+        return SINGLE_FLIGHT.do(self._request_key(prompt), lambda: self._fetch(key, prompt, record))
+
+    def generate_stream(self, prompt: str, use_cache: bool = True) -> Iterator[str]:
+        """
+        Yield the response as partial text chunks as they arrive
+
+        Mock mode simulates chunking word by word. The full text is cached
+        once the stream finishes, and a cached response is yielded at once.
+        """
+        record = AI_METRICS.start(self._provider_label(), prompt, streamed=True)
+        parts = []
         try:
-            response = self.model.generate_content(prompt)
-            return response.text.strip()
+            for chunk in self._generate_stream(prompt, use_cache, record):
+                record.first_byte()
+                parts.append(chunk)
+                yield chunk
+        finally:
+            AI_METRICS.finish(record, ''.join(parts))
+
+    def _generate_stream(self, prompt: str, use_cache: bool, record) -> Iterator[str]:
+        if self.mock_mode:
+            record.cache = 'bypass'
+            for word in self._mock_response(prompt).split(' '):
+                time.sleep(Config.MOCK_STREAM_DELAY)
+                yield word + ' '
+            return
+
+        key, cached = self._cache_lookup(prompt, use_cache)
+        if cached is not None:
+            record.cache = 'hit'
+            yield cached
+            return
+
+        record.cache = 'coalesced'
+        yield from SINGLE_FLIGHT.stream(self._request_key(prompt),
+                                        lambda: self._fetch_stream(key, prompt, record))
+
+    def _fetch_stream(self, key, prompt: str, record) -> Iterator[str]:
+        """Stream from Gemini, caching the full text if it completes"""
+        record.cache = 'miss' if key else 'bypass'
+        stats = {}
+        parts = []
+        try:
+            for chunk in self.client.stream(prompt, stats):
+                if chunk.text:
+                    parts.append(chunk.text)
+                    yield chunk.text
+        except CircuitOpenError:
+            # Degraded answer; not cached so the real one replaces it later
+            record.provider = 'fallback'
+            yield self._mock_response(prompt)
+            return
+        except Exception as e:
+            # Partial output is shown but never cached
+            record.outcome = 'error'
+            yield f"\n❌ Gemini Error: {str(e)}"
+            return
+        finally:
+            record.retries = stats.get('retries', 0)
+            record.hedges = stats.get('hedges', 0)
+        self._cache_store(key, ''.join(parts).strip())
+
+    async def generate_many(self, prompts: List[str], timeout: Optional[float] = None,
+                            limiter: Optional[RateLimiter] = None,
+                            max_concurrency: int = Config.MAX_CONCURRENT_REQUESTS) -> List[str]:
+        """
+        Generate responses for many prompts concurrently
+
+        Requests share a token-bucket limiter (requests/s and tokens/min) and
+        each one is bounded by a timeout. Cache hits and mock responses skip
+        the limiter. Results are returned in prompt order.
+        """
+        timeout = Config.REQUEST_TIMEOUT_SECONDS if timeout is None else timeout
+        limiter = limiter or RATE_LIMITER
+        semaphore = asyncio.Semaphore(max_concurrency)
+        loop = asyncio.get_running_loop()
+        # Own pool: sized to the concurrency cap, and timed-out calls don't
+        # hold up shutdown of the loop's default executor
+        executor = ThreadPoolExecutor(max_concurrency)
+
+        async def call(prompt, record):
+            if self.mock_mode:
+                record.cache = 'bypass'
+                return self._mock_response(prompt)
+
+            key, cached = self._cache_lookup(prompt)
+            if cached is not None:
+                record.cache = 'hit'
+                return cached
+
+            record.cache = 'coalesced'
+            async with semaphore:
+                await limiter.acquire(estimate_tokens(prompt) + Config.MAX_TOKENS)
+                try:
+                    return await asyncio.wait_for(
+                        loop.run_in_executor(executor, SINGLE_FLIGHT.do, self._request_key(prompt),
+                                             lambda: self._fetch(key, prompt, record)),
+                        timeout
+                    )
+                except asyncio.TimeoutError:
+                    return f"❌ Gemini Error: request timed out after {timeout:.0f}s"
+
+        async def run(prompt):
+            record = AI_METRICS.start(self._provider_label(), prompt)
+            response = await call(prompt, record)
+            AI_METRICS.finish(record, response)
+            return response
+
+        try:
+            return list(await asyncio.gather(*(run(prompt) for prompt in prompts)))
+        finally:
+            executor.shutdown(wait=False)
+
+    def _fetch(self, key, prompt: str, record) -> str:
+        """Call Gemini (with retries, hedging and the breaker) and cache the response"""
+        record.cache = 'miss' if key else 'bypass'
+        stats = {}
+        try:
+            response = self.client.generate(prompt, stats)
+        except CircuitOpenError:
+            # Degraded answer; not cached so the real one replaces it later
+            record.provider = 'fallback'
+            return self._mock_response(prompt)
         except Exception as e:
             return f"❌ Gemini Error: {str(e)}"
+        finally:
+            record.retries = stats.get('retries', 0)
+            record.hedges = stats.get('hedges', 0)
+        self._cache_store(key, response)
+        return response
+
+    def _provider_label(self) -> str:
+        return 'mock' if self.mock_mode else self.provider
+
+    def _request_key(self, prompt: str) -> str:
+        return ResponseCache.make_key(Config.AI_MODEL_GEMINI, Config.TEMPERATURE, prompt)
+
+    def _cache_lookup(self, prompt: str, use_cache: bool = True):
+        """Return (key, cached response or None); key is None if caching is off"""
+        if not use_cache or self.cache is None:
+            return None, None
+        key = self._request_key(prompt)
+        return key, self.cache.get(key)
+
+    def _cache_store(self, key, response: str):
+        # Never cache failures
+        if key is not None and not response.startswith("❌ Gemini Error"):
+            self.cache.put(key, response)
+
+    def cache_stats(self) -> Dict:
+        """Response cache hit/miss counters"""
+        return self.cache.stats() if self.cache is not None else {}
+
+    def coalescing_stats(self) -> Dict:
+        """How many calls shared an identical in-flight request"""
+        return SINGLE_FLIGHT.stats()
+
+    def resilience_stats(self) -> Dict:
+        """Breaker state, retry/hedge counts and observed p95 latency"""
+        return self.client.resilient.stats()
+
+    def metrics(self) -> Dict:
+        """Aggregated per-call latency, token, cache and cost metrics"""
+        return AI_METRICS.to_json()
 
     def _mock_response(self, prompt: str) -> str:
         pl = prompt.lower()
@@ -83,23 +422,41 @@ class AIEngine:
 # =======================================================================
 
 class DataInsightGenerator(AIEngine):
-    def analyze_dataset(self, data_summary: Dict) -> str:
-
-        prompt = f"""
-Analyze this dataset:
-
-Rows: {data_summary.get('rows')}
-Columns: {data_summary.get('columns')}
-Numeric Columns: {data_summary.get('numeric_columns')}
-Missing Values: {data_summary.get('missing_values')}
-
-Provide:
+    def analyze_dataset(self, data_summary: Dict, stream: bool = False) -> Union[str, Iterator[str]]:
+        prompt = self.dataset_prompt(data_summary)
+        return self.generate_stream(prompt) if stream else self.generate(prompt)
+
+    def dataset_prompt(self, data_summary: Dict) -> str:
+        # Highest-value facts first; long column lists, profiles and sample
+        # rows are cut to fit Config.PROMPT_TOKEN_BUDGET
+        builder = PromptBuilder(
+            Config.PROMPT_TOKEN_BUDGET,
+            header="Analyze this dataset:",
+            footer="""Provide:
 1. Data quality assessment
 2. Key observations
 3. Patterns
-4. Recommendations
-"""
-        return self.generate(prompt)
+4. Recommendations"""
+        )
+        columns = data_summary.get('columns') or []
+        builder.add_line("Rows", data_summary.get('rows'))
+        builder.add_line("Columns", len(columns) if isinstance(columns, list) else columns)
+        builder.add_line("Missing Values", data_summary.get('missing_values'))
+        builder.add_items("Missing by Column", [
+            f"{col}={count}" for col, count in (data_summary.get('missing_by_column') or {}).items()
+        ], max_tokens=80)
+        builder.add_items("Profile (mean/std/min/max)", [
+            f"{col} {s['mean']}/{s['std']}/{s['min']}/{s['max']}"
+            for col, s in (data_summary.get('profile') or {}).items()
+        ], separator='; ', max_tokens=300)
+        builder.add_items("Numeric Columns", data_summary.get('numeric_columns') or [], max_tokens=100)
+        builder.add_items("Sample Rows", [
+            json.dumps(row, default=str) for row in data_summary.get('sample_rows') or []
+        ], separator='\n', max_tokens=200)
+        if isinstance(columns, list):
+            builder.add_items("Column Names", columns)
+
+        return builder.build()
 
 
 # =======================================================================
@@ -107,16 +464,25 @@ Provide:
 # =======================================================================
 
 class TextInsightGenerator(AIEngine):
-    def enhance_summary(self, text: str, basic_summary: str) -> str:
-        prompt = f"""
-Improve this summary:
-
-Original: {text}
-Basic: {basic_summary}
-
-Provide a better 2-line summary.
-"""
-        return self.generate(prompt)
+    def enhance_summary(self, text: str, basic_summary: str, keywords: Optional[List] = None,
+                        stream: bool = False) -> Union[str, Iterator[str]]:
+        prompt = self.summary_prompt(text, basic_summary, keywords)
+        return self.generate_stream(prompt) if stream else self.generate(prompt)
+
+    def summary_prompt(self, text: str, basic_summary: str, keywords: Optional[List] = None) -> str:
+        # Summary and keywords first, then as much of the original as fits
+        builder = PromptBuilder(
+            Config.PROMPT_TOKEN_BUDGET,
+            header="Improve this summary:",
+            footer="Provide a better 2-line summary."
+        )
+        builder.add_text("Basic", basic_summary, max_tokens=300)
+        builder.add_items("Keywords", [
+            k['word'] if isinstance(k, dict) else k for k in keywords or []
+        ], max_tokens=60)
+        builder.add_text("Original", text)
+
+        return builder.build()
 
 
 # =======================================================================
@@ -124,17 +490,28 @@ Provide a better 2-line summary.
 # =======================================================================
 
 class ImageInsightGenerator(AIEngine):
-    def interpret_image_analysis(self, image_data: Dict) -> str:
-        prompt = f"""
+    def interpret_image_analysis(self, image_data: Dict,
+                                 stream: bool = False) -> Union[str, Iterator[str]]:
+        prompt = self.image_prompt(image_data)
+        return self.generate_stream(prompt) if stream else self.generate(prompt)
+
+    def image_prompt(self, image_data: Dict) -> str:
+        # Accepts a flat summary or ImageAnalyzer.full_analysis() output
+        colors = image_data.get('color_analysis') or {}
+        edges = image_data.get('edge_detection') or {}
+        palette = ", ".join(
+            f"{c['hex']} ({c['coverage']:.0%})" for c in image_data.get('palette') or []
+        )
+        return f"""
 Interpret image analysis:
 
-Brightness: {image_data.get('brightness')}
-Edges: {image_data.get('edges')}
-Color Variety: {image_data.get('color_variety')}
+Brightness: {image_data.get('brightness', colors.get('brightness'))}
+Edges: {image_data.get('edges', edges.get('complexity'))}
+Color Variety: {image_data.get('color_variety', colors.get('color_variety'))}
+Dominant Colors: {palette}
 
 Give insights.
 """
-        return self.generate(prompt)
 
 
 # =======================================================================
@@ -142,6 +519,7 @@ Give insights.
 # =======================================================================
 
 if __name__ == "__main__":
+    set_verbose(True)
 
     print("\n" + "="*80)
     print("🧠 GEMINI AI ENGINE TEST")
@@ -0,0 +1,213 @@
+import time
+from bisect import bisect_left
+from collections import deque
+from threading import Lock
+
+try:
+    from modules.rate_limiter import estimate_tokens
+except ImportError:  # running as a script from inside modules/
+    from rate_limiter import estimate_tokens
+
+LATENCY_BUCKETS = (0.01, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+TOKEN_BUCKETS = (16, 64, 128, 256, 512, 1024, 2048, 4096, 8192)
+
+
+class Histogram:
+    """Cumulative-bucket histogram (Prometheus semantics)"""
+
+    def __init__(self, buckets):
+        self.buckets = tuple(buckets)
+        self.counts = [0] * (len(self.buckets) + 1)  # last slot is +Inf
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value):
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def quantile(self, q):
+        """Upper bound of the bucket holding the q-quantile (None if empty)"""
+        if not self.count:
+            return None
+        target = q * self.count
+        seen = 0
+        for bound, count in zip(self.buckets + (float('inf'),), self.counts):
+            seen += count
+            if seen >= target:
+                return bound
+        return float('inf')
+
+    def cumulative(self):
+        total = 0
+        for bound, count in zip(self.buckets + (float('inf'),), self.counts):
+            total += count
+            yield bound, total
+
+
+class CallRecord:
+    """Measurements for one AI call, filled in as the call progresses"""
+
+    def __init__(self, provider, prompt, streamed=False):
+        self.started = time.perf_counter()
+        self.provider = provider
+        self.cache = 'miss'
+        self.streamed = streamed
+        self.prompt_tokens = estimate_tokens(prompt)
+        self.preview = ' '.join(prompt.split())[:80]
+        self.response_tokens = 0
+        self.ttfb_seconds = None
+        self.latency_seconds = None
+        self.retries = 0
+        self.hedges = 0
+        self.outcome = 'ok'
+
+    def first_byte(self):
+        if self.ttfb_seconds is None:
+            self.ttfb_seconds = time.perf_counter() - self.started
+
+    def as_dict(self):
+        return {
+            'provider': self.provider,
+            'cache': self.cache,
+            'streamed': self.streamed,
+            'outcome': self.outcome,
+            'prompt_tokens': self.prompt_tokens,
+            'response_tokens': self.response_tokens,
+            'ttfb_seconds': round(self.ttfb_seconds or 0.0, 4),
+            'latency_seconds': round(self.latency_seconds or 0.0, 4),
+            'retries': self.retries,
+            'hedges': self.hedges,
+            'prompt': self.preview
+        }
+
+
+class AIMetrics:
+    """
+    Process-wide aggregation of AI call records
+
+    Latency and time-to-first-byte histograms are labelled by provider
+    (gemini / mock / fallback) and cache status (hit / miss / coalesced /
+    bypass); token histograms by provider. Token counts are estimates
+    (~4 chars per token), and cost is estimated from them for upstream
+    calls only, counting retried and hedged attempts as extra input.
+    """
+
+    def __init__(self, input_cost_per_1k=0.0, output_cost_per_1k=0.0, recent=200):
+        self.input_cost_per_1k = input_cost_per_1k
+        self.output_cost_per_1k = output_cost_per_1k
+        self.requests = {}
+        self.latency = {}
+        self.ttfb = {}
+        self.prompt_tokens = {}
+        self.response_tokens = {}
+        self.retries = 0
+        self.hedges = 0
+        self.cost_usd = 0.0
+        self.recent = deque(maxlen=recent)
+        self._lock = Lock()
+
+    @staticmethod
+    def _histogram(table, labels, buckets):
+        if labels not in table:
+            table[labels] = Histogram(buckets)
+        return table[labels]
+
+    def start(self, provider, prompt, streamed=False):
+        return CallRecord(provider, prompt, streamed)
+
+    def finish(self, record, response):
+        """Close a record with the full response text and aggregate it"""
+        record.latency_seconds = time.perf_counter() - record.started
+        if record.ttfb_seconds is None:
+            record.ttfb_seconds = record.latency_seconds
+        record.response_tokens = estimate_tokens(response) if response else 0
+        if response.lstrip().startswith("❌"):
+            record.outcome = 'error'
+
+        labels = (record.provider, record.cache)
+        with self._lock:
+            self.requests[labels + (record.outcome,)] = self.requests.get(labels + (record.outcome,), 0) + 1
+            self._histogram(self.latency, labels, LATENCY_BUCKETS).observe(record.latency_seconds)
+            self._histogram(self.ttfb, labels, LATENCY_BUCKETS).observe(record.ttfb_seconds)
+            self._histogram(self.prompt_tokens, (record.provider,), TOKEN_BUCKETS).observe(record.prompt_tokens)
+            self._histogram(self.response_tokens, (record.provider,), TOKEN_BUCKETS).observe(record.response_tokens)
+            self.retries += record.retries
+            self.hedges += record.hedges
+            if record.provider == 'gemini' and record.cache in ('miss', 'bypass'):
+                attempts = 1 + record.retries + record.hedges
+                self.cost_usd += (attempts * record.prompt_tokens * self.input_cost_per_1k
+                                  + record.response_tokens * self.output_cost_per_1k) / 1000
+            self.recent.append(record.as_dict())
+        return record
+
+    def slowest(self, n=10):
+        """The n slowest recent calls"""
+        with self._lock:
+            calls = list(self.recent)
+        return sorted(calls, key=lambda call: call['latency_seconds'], reverse=True)[:n]
+
+    def to_json(self):
+        def summary(table, names):
+            return [
+                dict(zip(names, labels), count=h.count, sum=round(h.sum, 4),
+                     p50=h.quantile(0.5), p95=h.quantile(0.95),
+                     buckets={str(bound): total for bound, total in h.cumulative()})
+                for labels, h in sorted(table.items())
+            ]
+        with self._lock:
+            return {
+                'requests': [
+                    {'provider': p, 'cache': c, 'outcome': o, 'count': count}
+                    for (p, c, o), count in sorted(self.requests.items())
+                ],
+                'latency_seconds': summary(self.latency, ('provider', 'cache')),
+                'ttfb_seconds': summary(self.ttfb, ('provider', 'cache')),
+                'prompt_tokens': summary(self.prompt_tokens, ('provider',)),
+                'response_tokens': summary(self.response_tokens, ('provider',)),
+                'retries': self.retries,
+                'hedges': self.hedges,
+                'estimated_cost_usd': round(self.cost_usd, 6)
+            }
+
+    def to_prometheus(self):
+        """Prometheus text exposition format"""
+        lines = []
+
+        def label_text(names, values, extra=''):
+            pairs = [f'{n}="{v}"' for n, v in zip(names, values)]
+            if extra:
+                pairs.append(extra)
+            return '{' + ','.join(pairs) + '}' if pairs else ''
+
+        def histogram(name, help_text, table, names):
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} histogram")
+            for labels, h in sorted(table.items()):
+                for bound, total in h.cumulative():
+                    le = '+Inf' if bound == float('inf') else repr(float(bound))
+                    bucket_labels = label_text(names, labels, f'le="{le}"')
+                    lines.append(f"{name}_bucket{bucket_labels} {total}")
+                lines.append(f"{name}_sum{label_text(names, labels)} {h.sum}")
+                lines.append(f"{name}_count{label_text(names, labels)} {h.count}")
+
+        with self._lock:
+            lines.append("# HELP ai_requests_total AI calls by provider, cache status and outcome")
+            lines.append("# TYPE ai_requests_total counter")
+            for labels, count in sorted(self.requests.items()):
+                lines.append(f"ai_requests_total{label_text(('provider', 'cache', 'outcome'), labels)} {count}")
+            histogram("ai_request_latency_seconds", "Total call latency",
+                      self.latency, ('provider', 'cache'))
+            histogram("ai_time_to_first_byte_seconds", "Time until the first response text",
+                      self.ttfb, ('provider', 'cache'))
+            histogram("ai_prompt_tokens", "Estimated prompt tokens", self.prompt_tokens, ('provider',))
+            histogram("ai_response_tokens", "Estimated response tokens", self.response_tokens, ('provider',))
+            for name, help_text, value in (
+                ("ai_retries_total", "Retried upstream attempts", self.retries),
+                ("ai_hedges_total", "Hedged duplicate requests", self.hedges),
+                ("ai_estimated_cost_usd_total", "Estimated upstream cost", self.cost_usd),
+            ):
+                lines.append(f"# HELP {name} {help_text}")
+                lines.append(f"# TYPE {name} counter")
+                lines.append(f"{name} {value}")
+        return '\n'.join(lines) + '\n'
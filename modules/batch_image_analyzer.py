@@ -0,0 +1,209 @@
+import os
+import json
+import time
+import argparse
+from datetime import datetime
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, wait, FIRST_COMPLETED
+from multiprocessing import shared_memory, resource_tracker
+
+import numpy as np
+from PIL import Image
+
+try:
+    from modules.image_analyzer import ImageAnalyzer
+    from modules.instrumentation import is_verbose, say, set_verbose, trace
+except ImportError:  # running as a script from inside modules/
+    from image_analyzer import ImageAnalyzer
+    from instrumentation import is_verbose, say, set_verbose, trace
+
+IMAGE_EXTENSIONS = ('.png', '.jpg', '.jpeg', '.bmp', '.tif', '.tiff', '.webp')
+
+
+def find_images(directory, recursive=True):
+    """Walk a directory and return sorted image file paths"""
+    paths = []
+    for root, dirs, files in os.walk(directory):
+        dirs.sort()
+        for name in sorted(files):
+            if name.lower().endswith(IMAGE_EXTENSIONS):
+                paths.append(os.path.join(root, name))
+        if not recursive:
+            break
+    return paths
+
+
+def _decode_to_shared_memory(path, max_dimension):
+    """
+    Worker: decode one image into a new shared memory block
+
+    Only the block name, shape and dtype travel back to the parent, so the
+    pixel data is never pickled.
+    """
+    analyzer = ImageAnalyzer(path, max_dimension=max_dimension)
+    analyzer.pil_image = Image.open(path)
+    image = analyzer.decode_for_analysis()
+    if image is None:
+        raise ValueError(f"Failed to decode {path}")
+
+    shm = shared_memory.SharedMemory(create=True, size=image.nbytes)
+    np.ndarray(image.shape, dtype=image.dtype, buffer=shm.buf)[:] = image
+    # The parent unlinks the block; stop this worker's tracker from doing it
+    # too (it registers the POSIX name, which has a leading slash)
+    if os.name == 'posix':
+        resource_tracker.unregister(f"/{shm.name}", 'shared_memory')
+    shm.close()
+    return shm.name, image.shape, image.dtype.str
+
+
+def _unlink_shared(shm_name):
+    """Release a block that was decoded but never analyzed"""
+    try:
+        shm = shared_memory.SharedMemory(name=shm_name)
+    except FileNotFoundError:
+        return
+    shm.close()
+    shm.unlink()
+
+
+def _analyze_shared(path, shm_name, shape, dtype, max_dimension):
+    """Run the full_analysis steps on an image held in shared memory"""
+    shm = shared_memory.SharedMemory(name=shm_name)
+    try:
+        image = np.ndarray(shape, dtype=np.dtype(dtype), buffer=shm.buf)
+        analyzer = ImageAnalyzer(path, max_dimension=max_dimension)
+        analyzer.attach_image(image)
+        with trace(f"image {os.path.basename(path)}"):
+            results = analyzer.full_analysis()
+        # Drop views into the block before it is released
+        analyzer.image = None
+        del image
+        return results
+    finally:
+        shm.close()
+        shm.unlink()
+
+
+class BatchImageAnalyzer:
+    """
+    Analyze every image in a directory in parallel
+
+    Decoding runs in a process pool and hands arrays over through shared
+    memory; analysis runs in a thread pool (OpenCV/NumPy release the GIL).
+    Results are streamed as JSON lines to the output folder.
+    """
+
+    def __init__(self, directory, output_dir='outputs', workers=None,
+                 max_dimension=None, verbose=False):
+        self.directory = directory
+        self.output_dir = output_dir
+        self.workers = workers or os.cpu_count() or 1
+        self.max_dimension = max_dimension
+        self.verbose = verbose
+
+    def run(self):
+        """Process the directory; returns a summary dict"""
+        paths = find_images(self.directory)
+        os.makedirs(self.output_dir, exist_ok=True)
+        stamp = datetime.now().strftime('%Y%m%d_%H%M%S')
+        output_path = os.path.join(self.output_dir, f"batch_{stamp}.jsonl")
+
+        say(f"🖼️  Batch analysis: {len(paths)} images in {self.directory} "
+            f"({self.workers} workers)")
+
+        # Per-step analyzer output is only printed in verbose mode; the
+        # process-wide setting is restored when the run ends
+        was_verbose = is_verbose()
+        if self.verbose:
+            set_verbose(True)
+
+        processed = failed = 0
+        start = time.perf_counter()
+        pending = {}
+        # Decoded blocks not yet handed to _analyze_shared (which unlinks them)
+        unclaimed = set()
+        try:
+            with open(output_path, 'w', encoding='utf-8') as out, \
+                    ProcessPoolExecutor(self.workers) as decoders, \
+                    ThreadPoolExecutor(self.workers) as analyzers:
+                queue = list(reversed(paths))
+                # Bound in-flight images so shared memory use stays limited
+                max_in_flight = 2 * self.workers
+
+                while queue or pending:
+                    while queue and len(pending) < max_in_flight:
+                        path = queue.pop()
+                        future = decoders.submit(_decode_to_shared_memory, path, self.max_dimension)
+                        pending[future] = ('decode', path)
+
+                    done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                    for future in done:
+                        stage, path = pending.pop(future)
+                        try:
+                            value = future.result()
+                        except Exception as e:
+                            failed += 1
+                            out.write(json.dumps({'path': path, 'error': str(e)}) + '\n')
+                            continue
+
+                        if stage == 'decode':
+                            shm_name, shape, dtype = value
+                            unclaimed.add(shm_name)
+                            next_future = analyzers.submit(
+                                _analyze_shared, path, shm_name, shape, dtype, self.max_dimension
+                            )
+                            unclaimed.discard(shm_name)
+                            pending[next_future] = ('analyze', path)
+                        else:
+                            processed += 1
+                            out.write(json.dumps({'path': path, 'results': value}, default=str) + '\n')
+                            out.flush()
+        finally:
+            # On an error or interrupt, the pools have finished their running
+            # tasks by now; free the blocks whose analysis never started
+            for future, (stage, _) in pending.items():
+                if stage == 'decode' and future.done() and not future.cancelled() \
+                        and future.exception() is None:
+                    unclaimed.add(future.result()[0])
+            for shm_name in unclaimed:
+                _unlink_shared(shm_name)
+            set_verbose(was_verbose)
+
+        elapsed = time.perf_counter() - start
+        summary = {
+            'images': processed,
+            'failed': failed,
+            'seconds': round(elapsed, 3),
+            'images_per_second': round(processed / elapsed, 2) if elapsed > 0 else 0.0,
+            'output': output_path
+        }
+
+        say(f"✓ {processed} images analyzed, {failed} failed in {summary['seconds']:.2f}s "
+            f"({summary['images_per_second']:.2f} images/s)")
+        say(f"  Results: {output_path}")
+        return summary
+
+
+# ===========================================
+# TEST CODE
+# ===========================================
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Batch image analysis")
+    parser.add_argument('directory', nargs='?', default='data')
+    parser.add_argument('--workers', type=int, default=None)
+    parser.add_argument('--max-dimension', type=int, default=None)
+    parser.add_argument('--output-dir', default='outputs')
+    parser.add_argument('--verbose', action='store_true')
+    args = parser.parse_args()
+
+    summary = BatchImageAnalyzer(
+        args.directory,
+        output_dir=args.output_dir,
+        workers=args.workers,
+        max_dimension=args.max_dimension,
+        verbose=args.verbose
+    ).run()
+    if not is_verbose():  # run() only said it in verbose mode
+        print(f"✓ {summary['images']} images analyzed, {summary['failed']} failed in "
+              f"{summary['seconds']:.2f}s ({summary['images_per_second']:.2f} images/s)")
+        print(f"  Results: {summary['output']}")
@@ -0,0 +1,233 @@
+import cv2
+import numpy as np
+
+# Number of distinct 24-bit RGB colors
+COLOR_SPACE_SIZE = 1 << 24
+
+# Pixels processed per block (bounds the temporary buffers and keeps
+# calcHist's float32 bin counts exact)
+DEFAULT_CHUNK_PIXELS = 1 << 20
+
+# Pixels per bitset update (bounds its sort indices, 8 bytes per pixel)
+BITSET_CHUNK_PIXELS = 1 << 18
+
+
+def popcount(bitset):
+    """
+    Number of set bits in a uint8 array whose size is a multiple of 8
+
+    Classic SWAR bit counting on a uint64 view, in place in two buffers
+    the size of the bitset (np.unpackbits or np.bincount would expand it
+    eightfold).
+    """
+    m1, m2, m4 = (np.uint64(m) for m in (0x5555555555555555, 0x3333333333333333,
+                                         0x0F0F0F0F0F0F0F0F))
+    x = bitset.view(np.uint64).copy()
+    t = x >> np.uint64(1)
+    t &= m1
+    x -= t                              # bit pairs
+    np.right_shift(x, np.uint64(2), out=t)
+    t &= m2
+    x &= m2
+    x += t                              # nibbles
+    np.right_shift(x, np.uint64(4), out=t)
+    x += t
+    x &= m4                             # bytes
+    x *= np.uint64(0x0101010101010101)  # top byte sums all eight
+    x >>= np.uint64(56)
+    return int(x.sum())
+
+
+class ColorStatsAccumulator:
+    """
+    Accumulate color statistics over blocks of BGR pixels
+
+    Unique colors are tracked in a packed 2^24-bit bitset (2 MB) instead of
+    sorting pixel rows, and the per-channel / quantized histograms are
+    filled from the same pass with cv2.calcHist.
+    """
+
+    def __init__(self, bins_per_channel=8):
+        if bins_per_channel not in (2, 4, 8, 16, 32, 64, 128, 256):
+            raise ValueError("bins_per_channel must be a power of two between 2 and 256")
+        self.bins_per_channel = bins_per_channel
+        self.seen = np.zeros(COLOR_SPACE_SIZE // 8, dtype=np.uint8)
+        self.channel_counts = np.zeros((3, 256), dtype=np.int64)  # B, G, R
+        self.color_counts = np.zeros(bins_per_channel ** 3, dtype=np.int64)
+        self.pixel_count = 0
+
+    def _mark_seen(self, codes):
+        """Set the bits of 24-bit color codes in the packed bitset"""
+        # Grouped by bit position (a stable uint8 argsort is a radix sort),
+        # so within a group every write to a byte sets the same bit and
+        # repeated indices can't lose bits
+        bit = (codes & 7).astype(np.uint8)
+        byte = (codes >> 3)[np.argsort(bit, kind='stable')]
+        bounds = np.cumsum(np.bincount(bit, minlength=8))
+        for position in range(8):
+            start = bounds[position - 1] if position else 0
+            self.seen[byte[start:bounds[position]]] |= np.uint8(1 << position)
+
+    def update(self, pixels):
+        """Add an (N, 3) or (H, W, 3) block of BGR uint8 pixels"""
+        # (N, 1, 3) is a valid 3-channel image for the OpenCV kernels below
+        pixels = np.ascontiguousarray(pixels, dtype=np.uint8).reshape(-1, 1, 3)
+        bins = self.bins_per_channel
+        for start in range(0, len(pixels), DEFAULT_CHUNK_PIXELS):
+            block = pixels[start:start + DEFAULT_CHUNK_PIXELS]
+
+            # BGRA viewed as little-endian uint32 is 0xAARRGGBB -> mask alpha
+            codes = cv2.cvtColor(block, cv2.COLOR_BGR2BGRA).view(np.uint32).ravel() & 0xFFFFFF
+            for offset in range(0, len(codes), BITSET_CHUNK_PIXELS):
+                self._mark_seen(codes[offset:offset + BITSET_CHUNK_PIXELS])
+
+            for channel in range(3):
+                hist = cv2.calcHist([block], [channel], None, [256], [0, 256])
+                self.channel_counts[channel] += hist.ravel().astype(np.int64)
+
+            # calcHist indexes [b, g, r]; store R-major (r * bins^2 + g * bins + b)
+            hist = cv2.calcHist([block], [0, 1, 2], None, [bins] * 3, [0, 256] * 3)
+            self.color_counts += hist.transpose(2, 1, 0).ravel().astype(np.int64)
+            self.pixel_count += len(block)
+
+    def result(self):
+        """Return the accumulated statistics as a dict"""
+        n = max(self.pixel_count, 1)
+        levels = np.arange(256)
+        b_mean, g_mean, r_mean = (self.channel_counts @ levels) / n
+
+        return {
+            'pixel_count': int(self.pixel_count),
+            'unique_colors': popcount(self.seen),
+            'average_color': {'r': float(r_mean), 'g': float(g_mean), 'b': float(b_mean)},
+            'brightness': float((r_mean + g_mean + b_mean) / 3),
+            'channel_histograms': {
+                'r': self.channel_counts[2],
+                'g': self.channel_counts[1],
+                'b': self.channel_counts[0]
+            },
+            'color_histogram': self.color_counts,
+            'bins_per_channel': self.bins_per_channel
+        }
+
+
+def color_statistics(bgr_image, bins_per_channel=8, chunk_pixels=DEFAULT_CHUNK_PIXELS):
+    """
+    Compute color statistics for a BGR image in one chunked pass
+
+    Returns unique color count, average color, brightness, per-channel
+    256-bin histograms and a bins_per_channel^3 quantized color histogram.
+    """
+    pixels = np.asarray(bgr_image).reshape(-1, 3)
+    acc = ColorStatsAccumulator(bins_per_channel)
+    for start in range(0, len(pixels), chunk_pixels):
+        acc.update(pixels[start:start + chunk_pixels])
+    return acc.result()
+
+
+def sample_pixels(bgr_image, sample_size, rng):
+    """
+    Draw sample_size random pixels (with replacement) as an (N, 3) array
+
+    Indexes rows and columns directly so memory-mapped or strided images
+    are never flattened into a full-frame copy.
+    """
+    image = bgr_image if isinstance(bgr_image, np.ndarray) else np.asarray(bgr_image)
+    if image.ndim == 2:
+        if len(image) == 0:
+            return image
+        return image[rng.integers(0, len(image), size=sample_size)]
+    height, width = image.shape[:2]
+    if height * width == 0:
+        return np.empty((0, 3), dtype=np.uint8)
+    ys = rng.integers(0, height, size=sample_size)
+    xs = rng.integers(0, width, size=sample_size)
+    return np.asarray(image[ys, xs])
+
+
+def _kmeans_plus_plus(points, weights, k, rng):
+    """Pick k initial centers with weighted k-means++ seeding"""
+    centers = [points[rng.choice(len(points), p=weights / weights.sum())]]
+    closest = np.sum((points - centers[0]) ** 2, axis=1)
+    for _ in range(1, k):
+        probs = weights * closest
+        total = probs.sum()
+        if total <= 0:
+            break
+        centers.append(points[rng.choice(len(points), p=probs / total)])
+        closest = np.minimum(closest, np.sum((points - centers[-1]) ** 2, axis=1))
+    return np.array(centers, dtype=np.float32)
+
+
+def _nearest_center(points, centers):
+    """Index of the nearest center for every point (vectorized)"""
+    distances = (
+        np.sum(points ** 2, axis=1)[:, None]
+        - 2 * points @ centers.T
+        + np.sum(centers ** 2, axis=1)[None, :]
+    )
+    return np.argmin(distances, axis=1)
+
+
+def dominant_palette(bgr_image, n_colors=5, sample_size=20000, quant_bits=5,
+                     batch_size=1024, iterations=50, seed=0):
+    """
+    Extract the dominant colors of a BGR image with mini-batch k-means
+
+    A fixed-size random pixel sample is quantized to quant_bits per channel
+    and collapsed to weighted distinct colors, so the cost does not depend
+    on image resolution. Returns up to n_colors entries sorted by coverage.
+    """
+    rng = np.random.default_rng(seed)
+    sample = sample_pixels(bgr_image, sample_size, rng)
+    if len(sample) == 0:
+        return []
+
+    # Quantize the fixed-size sample and collapse to (color, weight) pairs
+    shift = 8 - quant_bits
+    quantized = (sample[:, ::-1] >> shift).astype(np.uint32)  # RGB order
+    codes = (quantized[:, 0] << (2 * quant_bits)) | (quantized[:, 1] << quant_bits) | quantized[:, 2]
+    codes, weights = np.unique(codes, return_counts=True)
+    mask = (1 << quant_bits) - 1
+    points = np.stack([
+        (codes >> (2 * quant_bits)) & mask,
+        (codes >> quant_bits) & mask,
+        codes & mask
+    ], axis=1).astype(np.float32)
+    # Bin centers back in 0-255 space
+    points = (points + 0.5) * (1 << shift)
+    weights = weights.astype(np.float64)
+
+    k = min(n_colors, len(points))
+    centers = _kmeans_plus_plus(points, weights, k, rng)
+    k = len(centers)
+    center_counts = np.zeros(k)
+    probs = weights / weights.sum()
+
+    # Mini-batch updates with per-center learning rate 1 / count
+    for _ in range(iterations):
+        batch = points[rng.choice(len(points), size=batch_size, p=probs)]
+        labels = _nearest_center(batch, centers)
+        for c in range(k):
+            members = batch[labels == c]
+            if len(members) == 0:
+                continue
+            center_counts[c] += len(members)
+            rate = len(members) / center_counts[c]
+            centers[c] += rate * (members.mean(axis=0) - centers[c])
+
+    # Coverage = share of sampled pixels closest to each center
+    labels = _nearest_center(points, centers)
+    coverage = np.bincount(labels, weights=weights, minlength=k) / weights.sum()
+
+    palette = []
+    for c in np.argsort(-coverage):
+        if coverage[c] == 0:
+            continue
+        r, g, b = (int(v) for v in np.clip(np.rint(centers[c]), 0, 255))
+        palette.append({
+            'rgb': {'r': r, 'g': g, 'b': b},
+            'hex': f"#{r:02x}{g:02x}{b:02x}",
+            'coverage': round(float(coverage[c]), 4)
+        })
+    return palette
@@ -1,83 +1,183 @@
 import pandas as pd
 import numpy as np
-import matplotlib.pyplot as plt
-import seaborn as sns
-import plotly.express as px
+
+try:
+    from modules.upload_buffer import ProgressReader, is_path, open_source, source_size
+    from modules.instrumentation import banner, say, set_verbose, timed, warn
+except ImportError:  # running as a script from inside modules/
+    from upload_buffer import ProgressReader, is_path, open_source, source_size
+    from instrumentation import banner, say, set_verbose, timed, warn
+
+# Left to pandas' path-based compression inference, so no byte progress
+COMPRESSED_SUFFIXES = ('.gz', '.bz2', '.zip', '.xz', '.zst', '.tar')
 
 class DataAnalyzer:
     """Simple data analyzer for CSV files"""
     
-    def __init__(self, filepath):
-        """Initialize with CSV file path"""
+    def __init__(self, filepath, name=None):
+        """
+        Initialize with a CSV file path or an in-memory upload
+
+        filepath may also be bytes, a memoryview or a BytesIO (e.g.
+        Streamlit's UploadedFile); it is parsed straight from memory.
+        """
         self.filepath = filepath
+        self.name = name or (filepath if is_path(filepath) else getattr(filepath, 'name', '<upload>'))
         self.df = None
         
-    def load_data(self):
-        """Load CSV file"""
+    @timed
+    def load_data(self, progress=None):
+        """
+        Load CSV file
+
+        progress: optional callback(fraction) called as the file is parsed
+        """
         try:
-            self.df = pd.read_csv(self.filepath)
-            print(f"✓ Successfully loaded {self.filepath}")
-            print(f"  Rows: {len(self.df)}")
-            print(f"  Columns: {len(self.df.columns)}")
+            # Paths keep pandas' compression inference; buffers are read in place
+            plain_path = is_path(self.filepath) and (
+                progress is None or str(self.filepath).lower().endswith(COMPRESSED_SUFFIXES)
+            )
+            if plain_path:
+                self.df = pd.read_csv(self.filepath)
+            else:
+                source = open_source(self.filepath)
+                if progress is not None:
+                    total = max(1, source_size(self.filepath))
+                    source = ProgressReader(source, lambda done: progress(done / total))
+                with source:
+                    self.df = pd.read_csv(source)
+            say(f"✓ Successfully loaded {self.name}")
+            say(f"  Rows: {len(self.df)}")
+            say(f"  Columns: {len(self.df.columns)}")
             return True
         except Exception as e:
-            print(f"✗ Error loading file: {e}")
+            warn(f"✗ Error loading file: {e}")
             return False
     
     def show_preview(self, rows=5):
         """Show first few rows"""
         if self.df is None:
-            print("Please load data first!")
+            warn("Please load data first!")
             return
         
-        print("\n" + "="*50)
-        print("DATA PREVIEW")
-        print("="*50)
-        print(self.df.head(rows))
+        banner("DATA PREVIEW", width=50)
+        say(self.df.head(rows))
     
+    @timed
     def get_info(self):
         """Get basic information"""
         if self.df is None:
             return None
         
-        np.info = {
+        info = {
             "shape": self.df.shape,
             "columns": list(self.df.columns),
             "dtypes": self.df.dtypes.astype(str).to_dict(),
             "missing": self.df.isnull().sum().to_dict()
         }
         
-        return np.info
+        return info
+        
+        banner("DATASET INFO", width=50)
+        say(f"Shape: {self.df.shape}")
+        say(f"Columns: {list(self.df.columns)}")
+        say(f"Data types:\n{self.df.dtypes}")
+        say(f"Missing values:\n{self.df.isnull().sum()}")
+    
+    @timed
+    def get_ai_summary(self, max_profile_columns=20, sample_rows=5, sample_columns=12):
+        """
+        Compact dataset summary for AI prompts
+
+        Profile statistics cover the first max_profile_columns numeric
+        columns and sample rows are evenly spaced (first sample_columns
+        columns only), so the cost is bounded and the summary is
+        deterministic.
+        """
+        if self.df is None:
+            return None
+        
+        missing = self.df.isnull().sum()
+        numeric = self.df.select_dtypes("number")
+        # describe() raises on a frame without columns (text-only datasets)
+        profile = numeric.iloc[:, :max_profile_columns].describe().T if len(numeric.columns) else None
+        
+        n = min(sample_rows, len(self.df))
+        positions = np.linspace(0, len(self.df) - 1, n).astype(int) if n else []
         
-        print("\n" + "="*50)
-        print("DATASET INFO")
-        print("="*50)
-        print(f"Shape: {self.df.shape}")
-        print(f"Columns: {list(self.df.columns)}")
-        print(f"Data types:\n{self.df.dtypes}")
-        print(f"Missing values:\n{self.df.isnull().sum()}")
+        return {
+            "rows": len(self.df),
+            "columns": list(self.df.columns),
+            "numeric_columns": list(numeric.columns),
+            "missing_values": int(missing.sum()),
+            "missing_by_column": {c: int(v) for c, v in missing.sort_values(ascending=False).items() if v > 0},
+            "profile": {
+                col: {stat: round(float(val), 3) for stat, val in row[["mean", "std", "min", "max"]].items()}
+                for col, row in profile.iterrows()
+            } if profile is not None else {},
+            "sample_rows": self.df.iloc[positions, :sample_columns].to_dict("records")
+        }
+    
+    def get_window(self, row_start=0, row_count=50, col_start=0, col_count=20):
+        """Rows/columns window of the data (a view; nothing outside it is touched)"""
+        if self.df is None:
+            return None
+        return self.df.iloc[row_start:row_start + row_count, col_start:col_start + col_count]
+    
+    @timed
+    def column_stats(self, column):
+        """
+        describe()-style statistics for one column
+
+        Numeric columns get count/mean/std/min/quartiles/max, others
+        count/unique/top/freq; both include dtype and missing. Nothing is
+        cached here: an analyzer can be shared through ResultMemo, whose
+        size accounting wouldn't see it grow, so callers cache per column.
+        """
+        series = self.df[column]
+        stats = {"dtype": str(series.dtype), "missing": int(series.isnull().sum())}
+        stats.update(series.describe().to_dict())
+        if "top" in stats:
+            stats["top"] = str(stats["top"])  # keeps the table's column one type
+        return stats
+    
+    @timed
+    def get_statistics_page(self, col_start=0, col_count=20, column_stats=None):
+        """
+        Statistics for a window of columns, one row per column
+
+        column_stats: optional callable(column) -> stats used instead of
+        self.column_stats, e.g. a memoized lookup.
+        """
+        if self.df is None:
+            return None
+        column_stats = column_stats or self.column_stats
+        columns = self.df.columns[col_start:col_start + col_count]
+        return pd.DataFrame.from_dict(
+            {col: column_stats(col) for col in columns}, orient="index"
+        )
     
     def get_statistics(self):
         """Get statistical summary"""
         if self.df is None:
-            print("Please load data first!")
+            warn("Please load data first!")
             return
         
-        print("\n" + "="*50)
-        print("STATISTICAL SUMMARY")
-        print("="*50)
-        print(self.df.describe())
+        banner("STATISTICAL SUMMARY", width=50)
+        say(self.df.describe())
     
     def plot_column(self, column_name):
         """Create a simple plot for a column"""
         if self.df is None:
-            print("Please load data first!")
+            warn("Please load data first!")
             return
         
         if column_name not in self.df.columns:
-            print(f"Column '{column_name}' not found!")
+            warn(f"Column '{column_name}' not found!")
             return
         
+        import plotly.express as px  # only needed for plotting; slow to import
+        
         # Check if numeric
         if pd.api.types.is_numeric_dtype(self.df[column_name]):
             # Numeric: create histogram
@@ -95,32 +195,31 @@ class DataAnalyzer:
     def count_missing(self):
         """Count missing values in each column"""
         if self.df is None:
-            print("Please load data first!")
+            warn("Please load data first!")
             return
         missing = self.df.isnull().sum()
-        print("\n" + "="*50)
-        print("MISSING VALUES COUNT")
-        print("="*50)
+        banner("MISSING VALUES COUNT", width=50)
         for col, count in missing.items():
             if count > 0:
-                print(f"{col}: {count} missing")
+                say(f"{col}: {count} missing")
     
     def find_max(self, column_name):
         """Find maximum value in a column"""
         if self.df is None:
-            print("Please load data first!")
+            warn("Please load data first!")
             return
     
         if column_name not in self.df.columns:
-            print(f"Column '{column_name}' not found!")
+            warn(f"Column '{column_name}' not found!")
             return
         max_value = self.df[column_name].max()
         max_row = self.df[self.df[column_name] == max_value]
-        print(f"\nMaximum {column_name}: {max_value}")
-        print("Row with maximum value:")
-        print(max_row)
+        say(f"\nMaximum {column_name}: {max_value}")
+        say("Row with maximum value:")
+        say(max_row)
 
 if __name__ == "__main__":
+    set_verbose(True)
     print("="*60)
     print("SMART INSIGHT ENGINE - WEEK 1 TEST")
     print("="*60)
@@ -0,0 +1,137 @@
+import json
+import http.client
+from threading import local
+from types import SimpleNamespace
+from urllib.parse import urlsplit
+
+
+class GeminiHTTPError(RuntimeError):
+    """Non-2xx reply from the Gemini REST API; code is the HTTP status"""
+
+    def __init__(self, code, message):
+        super().__init__(f"HTTP {code}: {message}")
+        self.code = code
+
+
+def _response_text(payload):
+    """Concatenate the text parts of the first candidate"""
+    candidates = payload.get('candidates') or []
+    if not candidates:
+        return ''
+    parts = candidates[0].get('content', {}).get('parts') or []
+    return ''.join(part.get('text', '') for part in parts)
+
+
+class GeminiRestModel:
+    """
+    Minimal Gemini REST client with the same generate_content() shape as
+    google.generativeai.GenerativeModel
+
+    Used when Config.GEMINI_BASE_URL points somewhere other than Google,
+    e.g. the local fake server in tests/fake_gemini_server.py, so the
+    engine can run offline and without the SDK installed. Each thread
+    keeps one keep-alive connection open between requests; every stream
+    gets a connection of its own, closed once the stream ends.
+    """
+
+    def __init__(self, base_url, api_key, model_name, temperature=0.7, max_tokens=1000,
+                 timeout=60.0):
+        url = urlsplit(base_url)
+        self.connection_class = (http.client.HTTPSConnection if url.scheme == 'https'
+                                 else http.client.HTTPConnection)
+        self.host = url.netloc
+        self.path_prefix = url.path.rstrip('/')
+        self.api_key = api_key
+        self.model_name = model_name
+        self.timeout = timeout
+        self.generation_config = {'temperature': temperature, 'maxOutputTokens': max_tokens}
+        self.connections_opened = 0
+        self._local = local()
+
+    def _connection(self):
+        connection = getattr(self._local, 'connection', None)
+        if connection is None:
+            connection = self._local.connection = self.connection_class(self.host, timeout=self.timeout)
+            self.connections_opened += 1
+        return connection
+
+    def _discard_connection(self):
+        connection = getattr(self._local, 'connection', None)
+        if connection is not None:
+            connection.close()
+            self._local.connection = None
+
+    def _request(self, method, prompt, query=''):
+        """Path, body and headers of a POST to one of the model's methods"""
+        path = f"{self.path_prefix}/v1beta/models/{self.model_name}:{method}?key={self.api_key}{query}"
+        body = json.dumps({
+            'contents': [{'parts': [{'text': prompt}]}],
+            'generationConfig': self.generation_config
+        }).encode('utf-8')
+        return path, body, {'Content-Type': 'application/json'}
+
+    def _raise_for_status(self, response):
+        if response.status >= 300:
+            message = response.read().decode('utf-8', 'replace')[:200]
+            raise GeminiHTTPError(response.status, message)
+
+    def _post(self, method, prompt):
+        path, body, headers = self._request(method, prompt)
+        for attempt in range(2):
+            connection = self._connection()
+            try:
+                connection.request('POST', path, body, headers)
+                response = connection.getresponse()
+                break
+            except (http.client.RemoteDisconnected, ConnectionResetError, BrokenPipeError):
+                # The server closed an idle keep-alive connection: reconnect once
+                self._discard_connection()
+                if attempt:
+                    raise
+            except Exception:
+                self._discard_connection()
+                raise
+
+        try:
+            self._raise_for_status(response)
+        finally:
+            if response.will_close:
+                self._discard_connection()
+        return response
+
+    def _stream(self, prompt):
+        """
+        Yield the chunks of a streamGenerateContent call
+
+        The body is read lazily, possibly on other threads than the one
+        that sent the request (ResilientClient pulls chunks on its
+        executor), and those threads may send requests of their own in
+        between. So the stream never uses the thread's keep-alive
+        connection: it opens its own and closes it when it ends.
+        """
+        path, body, headers = self._request('streamGenerateContent', prompt, '&alt=sse')
+        connection = self.connection_class(self.host, timeout=self.timeout)
+        self.connections_opened += 1
+        try:
+            connection.request('POST', path, body, headers)
+            response = connection.getresponse()
+            self._raise_for_status(response)
+            for line in response:
+                line = line.decode('utf-8').strip()
+                if line.startswith('data:'):
+                    yield SimpleNamespace(text=_response_text(json.loads(line[5:])))
+        finally:
+            connection.close()
+
+    def generate_content(self, prompt, stream=False):
+        if stream:
+            return self._stream(prompt)
+        response = self._post('generateContent', prompt)
+        try:
+            payload = json.loads(response.read())
+        except Exception:
+            self._discard_connection()
+            raise
+        if response.will_close:
+            self._discard_connection()
+        return SimpleNamespace(text=_response_text(payload))
@@ -3,6 +3,19 @@ import numpy as np
 from PIL import Image
 import os
 
+try:
+    from modules.color_stats import dominant_palette
+    from modules.image_hash import dhash, PerceptualCache
+    from modules.tiling import open_memmap_image, pixel_statistics
+    from modules.upload_buffer import BufferReader, buffer_of, is_path
+    from modules.instrumentation import banner, say, set_verbose, timed, warn
+except ImportError:  # running as a script from inside modules/
+    from color_stats import dominant_palette
+    from image_hash import dhash, PerceptualCache
+    from tiling import open_memmap_image, pixel_statistics
+    from upload_buffer import BufferReader, buffer_of, is_path
+    from instrumentation import banner, say, set_verbose, timed, warn
+
 # Tesseract configuration
 try:
     import pytesseract
@@ -12,208 +25,391 @@ try:
     TESSERACT_AVAILABLE = True
 except ImportError:
     TESSERACT_AVAILABLE = False
-    print("⚠️ pytesseract not installed. OCR features will be disabled.")
+    say("⚠️ pytesseract not installed. OCR features will be disabled.")
+
+# Decoder-side reduction flags (JPEG is scaled during the DCT)
+REDUCED_READ_FLAGS = {
+    1: cv2.IMREAD_COLOR,
+    2: cv2.IMREAD_REDUCED_COLOR_2,
+    4: cv2.IMREAD_REDUCED_COLOR_4,
+    8: cv2.IMREAD_REDUCED_COLOR_8
+}
+
+# Expected error of each metric in preview mode (max_dimension set)
+# relative to the full-resolution result
+PREVIEW_ERROR_BOUNDS = {
+    'average_color': "within ±1 level per channel (downscaling is area averaging, which preserves the mean)",
+    'brightness': "within ±1 level (mean of the average color)",
+    'unique_colors': "lower bound only - averaging merges neighbouring colors, so color_variety can drop a class",
+    'palette': "no extra bias - the palette is always built from a fixed-size pixel sample, so only its usual sampling variance applies",
+    'edge_percentage': "estimate within about ±25% for outline-dominated scenes - edge length is rescaled by the reduction factor; detail finer than the factor is lost, so textured images read low",
+    'text_extraction': "text smaller than roughly 10px times the reduction factor becomes unreadable; disable preview mode for OCR"
+}
+
+# OCR results keyed by a 256-bit dHash, shared by all analyzers in the
+# process. Near matches (within 4 bits) are only looked up among images of
+# the same analysis shape and options, so a preview never serves OCR to a
+# full-resolution run.
+OCR_HASH_SIZE = 16
+OCR_CACHE = PerceptualCache(max_entries=256, max_distance=4)
+
+
+def _text_from_ocr_data(data):
+    """Rebuild the plain text layout from pytesseract.image_to_data output"""
+    lines = []
+    current_line = None
+    current_block = None
+    for i, word in enumerate(data['text']):
+        if not word.strip():
+            continue
+        block = (data['block_num'][i], data['par_num'][i])
+        line = block + (data['line_num'][i],)
+        if line != current_line:
+            # Blank line between paragraphs, like image_to_string
+            if current_block is not None and block != current_block:
+                lines.append('')
+            lines.append(word)
+            current_line, current_block = line, block
+        else:
+            lines[-1] += ' ' + word
+    return '\n'.join(lines)
+
 
 class ImageAnalyzer:
     """
     Analyze images - extract text, metadata, and visual features
     """
     
-    def __init__(self, image_path):
-        """Initialize with image file path"""
+    def __init__(self, image_path, max_dimension=None, tile_size=None, name=None):
+        """
+        Initialize with image file path
+
+        image_path may also be an in-memory upload (bytes, memoryview or
+        BytesIO); it is decoded straight from memory with cv2.imdecode and
+        `name` is used as its filename.
+
+        max_dimension: optional preview resolution. When set, the longest
+        side is reduced to about this many pixels at decode time (see
+        PREVIEW_ERROR_BOUNDS for the accuracy trade-off).
+        tile_size: optional tiled mode for very large images. Uncompressed
+        files are memory-mapped and color/edge statistics are accumulated
+        per tile, so working memory is bounded by the tile size.
+        """
         self.image_path = image_path
+        self.name = name or (image_path if is_path(image_path) else getattr(image_path, 'name', '<upload>'))
+        self.max_dimension = max_dimension
+        self.tile_size = tile_size
         self.image = None
         self.pil_image = None
+        self.scale = 1.0
+        self._pixel_stats = None
         
+    @timed
     def load_image(self):
         """Load image using both OpenCV and PIL"""
         try:
             # Check if file exists
-            if not os.path.exists(self.image_path):
-                print(f"✗ File not found: {self.image_path}")
+            if is_path(self.image_path) and not os.path.exists(self.image_path):
+                warn(f"✗ File not found: {self.image_path}")
                 return False
             
-            # Load with OpenCV (for analysis)
-            self.image = cv2.imread(self.image_path)
+            # Load with PIL (lazy - only the header is read, for metadata)
+            self.pil_image = self._open_pil()
+            
+            # Tiled mode: map uncompressed pixels straight from disk
+            self.image = None
+            self._pixel_stats = None
+            if self.tile_size and not self.max_dimension and is_path(self.image_path):
+                self.image = open_memmap_image(self.image_path)
+                if self.image is not None:
+                    say(f"  Memory-mapped for tiled analysis ({self.tile_size}px tiles)")
+            
+            # Load with OpenCV (for analysis), reduced at decode time if requested
+            if self.image is None:
+                self.image = self.decode_for_analysis()
             if self.image is None:
-                print("✗ Failed to load image with OpenCV")
+                warn("✗ Failed to load image with OpenCV")
                 return False
             
-            # Load with PIL (for metadata)
-            self.pil_image = Image.open(self.image_path)
-            print(f"✓ Image loaded successfully!")
-            print(f"  Path: {self.image_path}")
+            self.scale = self._analysis_scale()
+            say(f"✓ Image loaded successfully!")
+            say(f"  Path: {self.name}")
+            if self.scale > 1:
+                say(f"  Analysis resolution: {self.image.shape[1]}x{self.image.shape[0]} "
+                    f"(1/{self.scale:.1f} of full size)")
             return True
         except Exception as e:
-            print(f"✗ Error loading image: {e}")
+            warn(f"✗ Error loading image: {e}")
             return False
     
+    def attach_image(self, image):
+        """Use an already-decoded BGR array instead of calling load_image"""
+        self.pil_image = self._open_pil()
+        self.image = image
+        self.scale = self._analysis_scale()
+        self._pixel_stats = None
+    
+    def _analysis_scale(self):
+        """
+        Full-size / analysis-size ratio (1.0 unless preview mode shrank it)
+
+        OpenCV applies EXIF orientation and PIL does not, so a rotated JPEG
+        has width and height swapped between the two; the longest sides are
+        compared instead, which rotation does not change.
+        """
+        if not self.max_dimension:
+            return 1.0
+        return max(self.pil_image.size) / max(self.image.shape[:2])
+    
+    def analysis_options(self):
+        """Options that change the results (duplicates only match on equal options)"""
+        return {'max_dimension': self.max_dimension, 'tile_size': self.tile_size}
+    
+    @timed
+    def pixel_statistics(self):
+        """
+        Color, grayscale and edge statistics from one fused pass (cached)
+
+        analyze_colors and detect_edges both read from this, so the pixels
+        are walked once per loaded image.
+        """
+        if self._pixel_stats is None:
+            self._pixel_stats = pixel_statistics(self.image, tile_size=self.tile_size)
+        return self._pixel_stats
+    
+    def _open_pil(self):
+        if is_path(self.image_path):
+            return Image.open(self.image_path)
+        return Image.open(BufferReader(buffer_of(self.image_path)))
+    
+    def _imread(self, flags=cv2.IMREAD_COLOR):
+        """cv2.imread for paths, cv2.imdecode over the upload's own bytes otherwise"""
+        if is_path(self.image_path):
+            return cv2.imread(self.image_path, flags)
+        return cv2.imdecode(np.frombuffer(buffer_of(self.image_path), np.uint8), flags)
+    
+    def decode_for_analysis(self):
+        """Decode the image, letting the decoder downscale for preview mode"""
+        full_size = max(self.pil_image.size)
+        if not self.max_dimension or full_size <= self.max_dimension:
+            return self._imread()
+        
+        # Largest power-of-two reduction that stays at or above the target.
+        # For JPEG this is done in the DCT domain, so full-size pixels are
+        # never materialized; other formats are decoded then reduced.
+        factor = 1
+        while factor < 8 and full_size / (factor * 2) >= self.max_dimension:
+            factor *= 2
+        image = self._imread(REDUCED_READ_FLAGS[factor])
+        if image is None:
+            return None
+        
+        # Area-average the remainder down to the exact target size
+        h, w = image.shape[:2]
+        ratio = self.max_dimension / max(h, w)
+        if ratio < 1:
+            image = cv2.resize(image, (max(1, round(w * ratio)), max(1, round(h * ratio))),
+                               interpolation=cv2.INTER_AREA)
+        return image
+    
+    @timed
     def get_metadata(self):
         """Extract image metadata"""
         if self.pil_image is None or self.image is None:
-            print("❌ Please load image first!")
+            warn("❌ Please load image first!")
             return None
         
-        print("\n" + "="*80)
-        print("📋 IMAGE METADATA")
-        print("="*80)
+        banner("📋 IMAGE METADATA")
         
         metadata = {
-            'filename': os.path.basename(self.image_path),
+            'filename': os.path.basename(self.name),
             'format': self.pil_image.format,
             'mode': self.pil_image.mode,
             'width': self.pil_image.width,
             'height': self.pil_image.height,
             'aspect_ratio': round(self.pil_image.width / self.pil_image.height, 2),
             'size_pixels': self.pil_image.width * self.pil_image.height,
-            'channels': self.image.shape[2] if len(self.image.shape) == 3 else 1
+            'channels': self.image.shape[2] if len(self.image.shape) == 3 else 1,
+            'analysis_width': self.image.shape[1],
+            'analysis_height': self.image.shape[0],
+            'analysis_scale': round(self.scale, 2)
         }
         
         # Display metadata
         for key, value in metadata.items():
-            print(f"  {key}: {value}")
+            say(f"  {key}: {value}")
         
         return metadata
     
+    @timed
     def extract_text(self):
         """Extract text from image using OCR"""
         if self.image is None:
-            print("❌ Please load image first!")
+            warn("❌ Please load image first!")
             return None
         
         if not TESSERACT_AVAILABLE:
-            print("\n" + "="*80)
-            print("📝 TEXT EXTRACTION (OCR)")
-            print("="*80)
-            print("❌ Tesseract OCR not available.")
-            print("  Install: pip install pytesseract")
-            print("  And download Tesseract from:")
-            print("  https://github.com/UB-Mannheim/tesseract/wiki")
+            banner("📝 TEXT EXTRACTION (OCR)")
+            say("❌ Tesseract OCR not available.")
+            say("  Install: pip install pytesseract")
+            say("  And download Tesseract from:")
+            say("  https://github.com/UB-Mannheim/tesseract/wiki")
             return None
         
-        print("\n" + "="*80)
-        print("📝 TEXT EXTRACTION (OCR)")
-        print("="*80)
+        banner("📝 TEXT EXTRACTION (OCR)")
+        
+        if self.tile_size:
+            say("  Skipped in tiled mode (OCR needs the full frame in memory)")
+            return None
         
         try:
-            # Convert to RGB for Tesseract
-            rgb_image = cv2.cvtColor(self.image, cv2.COLOR_BGR2RGB)
-            pil_img = Image.fromarray(rgb_image)
-            
-            # Extract text
-            print("  Extracting text...", end=' ')
-            text = pytesseract.image_to_string(pil_img)
+            # Re-uploads and near-identical screenshots at the same resolution reuse earlier OCR
+            cache_key = dhash(self.image, OCR_HASH_SIZE)
+            scope = (self.image.shape, tuple(sorted(self.analysis_options().items())))
+            cached = OCR_CACHE.get(cache_key, scope)
             
-            # Get detailed data with confidence scores
-            data = pytesseract.image_to_data(pil_img, output_type=pytesseract.Output.DICT)
-            
-            # Count words with confidence > 60
-            confident_words = sum(1 for conf in data['conf'] if str(conf).isdigit() and int(conf) > 60)
-            
-            result = {
-                'text': text.strip(),
-                'word_count': len(text.split()),
-                'character_count': len(text),
-                'confident_words': confident_words,
-                'has_text': len(text.strip()) > 0
-            }
+            say("  Extracting text...", end=' ')
+            if cached is not None:
+                result = dict(cached, cached=True)
+                text = result['text']
+                say("(cached)", end=' ')
+            else:
+                # Convert to RGB for Tesseract
+                rgb_image = cv2.cvtColor(self.image, cv2.COLOR_BGR2RGB)
+                pil_img = Image.fromarray(rgb_image)
+                
+                # Single Tesseract pass: text and confidence scores together
+                data = pytesseract.image_to_data(pil_img, output_type=pytesseract.Output.DICT)
+                text = _text_from_ocr_data(data)
+                
+                # Count words with confidence > 60
+                confident_words = sum(1 for word, conf in zip(data['text'], data['conf'])
+                                      if word.strip() and float(conf) > 60)
+                
+                result = {
+                    'text': text,
+                    'word_count': len(text.split()),
+                    'character_count': len(text),
+                    'confident_words': confident_words,
+                    'has_text': len(text) > 0,
+                    'cached': False
+                }
+                OCR_CACHE.put(cache_key, result, scope)
             
-            print("✓")
+            say("✓")
             
             if result['has_text']:
-                print(f"\n  Words found: {result['word_count']}")
-                print(f"  Characters: {result['character_count']}")
-                print(f"  High confidence words: {result['confident_words']}")
-                print(f"\n  Extracted Text:")
-                print("  " + "-"*76)
+                say(f"\n  Words found: {result['word_count']}")
+                say(f"  Characters: {result['character_count']}")
+                say(f"  High confidence words: {result['confident_words']}")
+                say(f"\n  Extracted Text:")
+                say("  " + "-"*76)
                 preview = text[:500] + ("..." if len(text) > 500 else "")
                 for line in preview.split('\n'):
                     if line.strip():
-                        print(f"  {line}")
-                print("  " + "-"*76)
+                        say(f"  {line}")
+                say("  " + "-"*76)
             else:
-                print("  No text detected in image")
+                say("  No text detected in image")
             
             return result
             
         except Exception as e:
-            print(f"✗ Error: {e}")
+            warn(f"✗ Error: {e}")
             if "tesseract is not installed" in str(e).lower():
-                print("\n  💡 Tesseract not found! Please:")
-                print("     1. Install from: https://github.com/UB-Mannheim/tesseract/wiki")
-                print("     2. Add to PATH or set pytesseract.pytesseract.tesseract_cmd")
+                say("\n  💡 Tesseract not found! Please:")
+                say("     1. Install from: https://github.com/UB-Mannheim/tesseract/wiki")
+                say("     2. Add to PATH or set pytesseract.pytesseract.tesseract_cmd")
             return {
                 'text': '',
                 'error': str(e),
                 'has_text': False
             }
     
+    @timed
     def analyze_colors(self):
         """Analyze dominant colors in the image"""
         if self.image is None:
-            print("❌ Please load image first!")
+            warn("❌ Please load image first!")
             return None
         
-        print("\n" + "="*80)
-        print("🎨 COLOR ANALYSIS")
-        print("="*80)
-        
-        # Convert to RGB
-        rgb_image = cv2.cvtColor(self.image, cv2.COLOR_BGR2RGB)
-        
-        # Reshape to list of pixels
-        pixels = rgb_image.reshape(-1, 3)
+        banner("🎨 COLOR ANALYSIS")
         
-        # Calculate average color
-        avg_color = np.mean(pixels, axis=0).astype(int)
+        # Shared fused pass: bitset unique count + histograms
+        stats = self.pixel_statistics()
         
-        # Calculate color distribution
-        unique_colors = len(np.unique(pixels, axis=0))
-        
-        # Determine if image is mostly bright or dark
-        brightness = np.mean(pixels)
+        avg_color = stats['average_color']
+        unique_colors = stats['unique_colors']
+        brightness = stats['brightness']
         
         result = {
             'average_color': {
-                'r': int(avg_color[0]),
-                'g': int(avg_color[1]),
-                'b': int(avg_color[2])
+                'r': int(avg_color['r']),
+                'g': int(avg_color['g']),
+                'b': int(avg_color['b'])
             },
             'unique_colors': unique_colors,
             'brightness': round(brightness, 2),
             'is_bright': brightness > 127,
-            'color_variety': 'high' if unique_colors > 10000 else 'medium' if unique_colors > 1000 else 'low'
+            'color_variety': 'high' if unique_colors > 10000 else 'medium' if unique_colors > 1000 else 'low',
+            'channel_histograms': {
+                channel: counts.tolist() for channel, counts in stats['channel_histograms'].items()
+            },
+            'color_histogram': {
+                'bins_per_channel': stats['bins_per_channel'],
+                'counts': stats['color_histogram'].tolist()
+            }
         }
         
         # Display results
-        print(f"  Average Color (RGB): ({result['average_color']['r']}, "
-              f"{result['average_color']['g']}, {result['average_color']['b']})")
-        print(f"  Unique Colors: {result['unique_colors']:,}")
-        print(f"  Brightness: {result['brightness']:.1f} / 255")
-        print(f"  Image is: {'Bright' if result['is_bright'] else 'Dark'}")
-        print(f"  Color Variety: {result['color_variety']}")
+        say(f"  Average Color (RGB): ({result['average_color']['r']}, "
+            f"{result['average_color']['g']}, {result['average_color']['b']})")
+        say(f"  Unique Colors: {result['unique_colors']:,}")
+        say(f"  Brightness: {result['brightness']:.1f} / 255")
+        say(f"  Image is: {'Bright' if result['is_bright'] else 'Dark'}")
+        say(f"  Color Variety: {result['color_variety']}")
         
         return result
     
+    @timed
+    def extract_palette(self, n_colors=5):
+        """Extract the dominant color palette with sampled mini-batch k-means"""
+        if self.image is None:
+            warn("❌ Please load image first!")
+            return None
+        
+        banner(f"🖌️  DOMINANT COLORS (Top {n_colors})")
+        
+        # Fixed-size pixel sample -> cost is independent of resolution
+        palette = dominant_palette(self.image, n_colors=n_colors)
+        
+        # Display palette
+        say("\n  Rank | Color   | Coverage")
+        say("  " + "-"*40)
+        for i, color in enumerate(palette, 1):
+            say(f"  {i:2d}   | {color['hex']} | {color['coverage']*100:5.1f}%")
+        
+        return palette
+    
+    @timed
     def detect_edges(self):
         """Detect edges in the image"""
         if self.image is None:
-            print("❌ Please load image first!")
+            warn("❌ Please load image first!")
             return None
         
-        print("\n" + "="*80)
-        print("🔍 EDGE DETECTION")
-        print("="*80)
-        
-        # Convert to grayscale
-        gray = cv2.cvtColor(self.image, cv2.COLOR_BGR2GRAY)
+        banner("🔍 EDGE DETECTION")
         
-        # Apply Canny edge detection
-        edges = cv2.Canny(gray, 100, 200)
+        # Grayscale + Canny (100, 200) come from the shared fused pass
+        stats = self.pixel_statistics()
+        edge_pixels = stats['edge_pixels']
+        total_pixels = stats['total_pixels']
         
-        # Count edge pixels
-        edge_pixels = np.sum(edges > 0)
-        total_pixels = edges.size
+        # In preview mode, edges are 1px lines whose length scales linearly,
+        # so estimate the full-resolution counts (see PREVIEW_ERROR_BOUNDS)
+        if self.scale > 1:
+            edge_pixels = edge_pixels * self.scale
+            total_pixels = self.pil_image.width * self.pil_image.height
         edge_percentage = (edge_pixels / total_pixels) * 100
         
         result = {
@@ -224,31 +420,62 @@ class ImageAnalyzer:
         }
         
         # Display results
-        print(f"  Edge Pixels: {result['edge_pixels']:,} / {result['total_pixels']:,}")
-        print(f"  Edge Percentage: {result['edge_percentage']:.2f}%")
-        print(f"  Image Complexity: {result['complexity']}")
+        say(f"  Edge Pixels: {result['edge_pixels']:,} / {result['total_pixels']:,}")
+        say(f"  Edge Percentage: {result['edge_percentage']:.2f}%")
+        say(f"  Image Complexity: {result['complexity']}")
         
         return result
     
-    def full_analysis(self):
-        """Perform complete image analysis"""
-        print("\n" + "="*80)
-        print("🖼️  COMPLETE IMAGE ANALYSIS")
-        print("="*80)
+    @timed
+    def full_analysis(self, history=None, progress=None):
+        """
+        Perform complete image analysis
+
+        history: optional DuplicateIndex. If an earlier image analyzed with
+        the same options is within its Hamming threshold, the stored results
+        are returned instead of re-running the analysis; new results are
+        recorded in it.
+        progress: optional callback(step, fraction, **partial_results),
+        called before each step (e.g. Job.report for background jobs).
+        """
+        report = progress or (lambda step, fraction=None, **partial: None)
+        banner("🖼️  COMPLETE IMAGE ANALYSIS")
         
-        if not self.load_image():
+        fingerprint = None
+        in_memory = not is_path(self.image_path)
+        if history is not None and (in_memory or os.path.exists(self.image_path)):
+            fingerprint = history.fingerprint(buffer_of(self.image_path) if in_memory else self.image_path)
+            match = history.find(fingerprint, options=self.analysis_options())
+            if match is not None:
+                say(f"♻️  Matches earlier image {match['path']} "
+                    f"(distance {match['distance']}) - reusing its results")
+                return dict(match['results'], duplicate_of={
+                    'path': match['path'],
+                    'distance': match['distance']
+                })
+        
+        # Skip decoding if an array was already attached (e.g. batch mode)
+        report('loading', 0.0)
+        if self.image is None and not self.load_image():
             return None
         
-        results = {
-            'metadata': self.get_metadata(),
-            'text_extraction': self.extract_text(),
-            'color_analysis': self.analyze_colors(),
-            'edge_detection': self.detect_edges()
-        }
+        steps = [
+            ('metadata', self.get_metadata),
+            ('text_extraction', self.extract_text),
+            ('color_analysis', self.analyze_colors),
+            ('palette', self.extract_palette),
+            ('edge_detection', self.detect_edges)
+        ]
+        results = {}
+        for i, (name, step) in enumerate(steps):
+            report(name, (i + 1) / (len(steps) + 1), **results)
+            results[name] = step()
+        report('done', 1.0, **results)
+        
+        banner("✅ IMAGE ANALYSIS COMPLETE")
         
-        print("\n" + "="*80)
-        print("✅ IMAGE ANALYSIS COMPLETE")
-        print("="*80)
+        if fingerprint is not None:
+            history.add(fingerprint, self.name, results, options=self.analysis_options())
         
         return results
 
@@ -258,6 +485,7 @@ class ImageAnalyzer:
 # ===========================================
 
 if __name__ == "__main__":
+    set_verbose(True)
     
     # Check if test images exist
     test_images = [
@@ -0,0 +1,286 @@
+import os
+import json
+import time
+from collections import OrderedDict, deque
+from threading import Lock
+
+import cv2
+import numpy as np
+
+
+def _to_gray(image):
+    """BGR or grayscale array -> grayscale array"""
+    if image.ndim == 3:
+        return cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
+    return image
+
+
+def _bits_to_int(bits):
+    """Pack a boolean array into a Python int (row-major, MSB first)"""
+    value = 0
+    for bit in np.asarray(bits).ravel():
+        value = (value << 1) | int(bit)
+    return value
+
+
+def dhash(image, hash_size=8):
+    """
+    Difference hash of an image array
+
+    The image is area-resized to (hash_size + 1) x hash_size and each bit
+    records whether a pixel is brighter than its right neighbour. Returns a
+    hash_size^2-bit integer.
+    """
+    small = cv2.resize(_to_gray(image), (hash_size + 1, hash_size), interpolation=cv2.INTER_AREA)
+    return _bits_to_int(small[:, 1:] > small[:, :-1])
+
+
+def ahash(image, hash_size=8):
+    """Average hash: each bit is whether a pixel is above the mean"""
+    small = cv2.resize(_to_gray(image), (hash_size, hash_size), interpolation=cv2.INTER_AREA)
+    return _bits_to_int(small > small.mean())
+
+
+def phash(image, hash_size=8, highfreq_factor=4):
+    """
+    Perceptual (DCT) hash
+
+    Keeps the lowest hash_size x hash_size DCT coefficients of a 32x32
+    grayscale thumbnail and thresholds them at their median, which makes it
+    robust to rescaling, re-encoding and mild color/brightness edits.
+    """
+    size = hash_size * highfreq_factor
+    small = cv2.resize(_to_gray(image), (size, size), interpolation=cv2.INTER_AREA)
+    dct = cv2.dct(small.astype(np.float32))[:hash_size, :hash_size]
+    return _bits_to_int(dct > np.median(dct))
+
+
+HASH_FUNCTIONS = {'ahash': ahash, 'dhash': dhash, 'phash': phash}
+
+
+def hamming(a, b):
+    """Number of differing bits between two integer hashes"""
+    return bin(a ^ b).count('1')
+
+
+class PerceptualCache:
+    """
+    Thread-safe LRU cache keyed by perceptual hash
+
+    get() returns the value stored under the closest hash within
+    max_distance bits, so re-encoded or slightly edited copies of an image
+    hit the same entry. Keys only match within the same scope (any
+    hashable, e.g. the image shape and analysis options), so inputs that
+    look alike but were analyzed differently never share an entry.
+    """
+
+    def __init__(self, max_entries=256, max_distance=0):
+        self.max_entries = max_entries
+        self.max_distance = max_distance
+        self.entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self._lock = Lock()
+
+    def _find(self, key, scope):
+        if (scope, key) in self.entries:
+            return scope, key
+        if self.max_distance == 0:
+            return None
+        best, best_distance = None, self.max_distance + 1
+        for stored in self.entries:
+            if stored[0] != scope:
+                continue
+            distance = hamming(key, stored[1])
+            if distance < best_distance:
+                best, best_distance = stored, distance
+        return best
+
+    def get(self, key, scope=None):
+        """Return the cached value for key (or a near match in scope), else None"""
+        with self._lock:
+            match = self._find(key, scope)
+            if match is None:
+                self.misses += 1
+                return None
+            self.entries.move_to_end(match)
+            self.hits += 1
+            return self.entries[match]
+
+    def put(self, key, value, scope=None):
+        """Store value under key in scope, evicting the least recently used entry"""
+        with self._lock:
+            self.entries[scope, key] = value
+            self.entries.move_to_end((scope, key))
+            while len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self.entries.clear()
+            self.hits = self.misses = 0
+
+    def stats(self):
+        return {'entries': len(self.entries), 'hits': self.hits, 'misses': self.misses}
+
+
+class MultiIndexHash:
+    """
+    Multi-index hashing for Hamming range search
+
+    Each hash is split into max_distance + 1 chunks, with one exact-match
+    table per chunk. By the pigeonhole principle, any hash within
+    max_distance bits shares at least one chunk with the query, so only
+    those bucket entries are checked. Lookups on tens of thousands of
+    hashes take well under a millisecond.
+    """
+
+    def __init__(self, bits=64, max_distance=6):
+        self.bits = bits
+        self.max_distance = max_distance
+        chunks = max_distance + 1
+        bounds = [round(i * bits / chunks) for i in range(chunks + 1)]
+        self.chunks = [(lo, (1 << (hi - lo)) - 1) for lo, hi in zip(bounds, bounds[1:])]
+        self.tables = [{} for _ in self.chunks]
+        self.values = {}
+
+    def _parts(self, key):
+        return [(key >> shift) & mask for shift, mask in self.chunks]
+
+    def add(self, key, value):
+        """Insert value under key (several values may share a key)"""
+        if key not in self.values:
+            self.values[key] = []
+            for table, part in zip(self.tables, self._parts(key)):
+                table.setdefault(part, []).append(key)
+        self.values[key].append(value)
+
+    def remove(self, key, value):
+        """Drop one value stored under key (matched by identity)"""
+        values = self.values.get(key, [])
+        values[:] = [v for v in values if v is not value]
+        if not values and key in self.values:
+            del self.values[key]
+            for table, part in zip(self.tables, self._parts(key)):
+                bucket = table[part]
+                bucket.remove(key)
+                if not bucket:
+                    del table[part]
+
+    def search(self, key, max_distance=None):
+        """Return (distance, value) pairs within max_distance, closest first"""
+        radius = self.max_distance if max_distance is None else min(max_distance, self.max_distance)
+        candidates = set()
+        for table, part in zip(self.tables, self._parts(key)):
+            candidates.update(table.get(part, ()))
+        matches = []
+        for candidate in candidates:
+            distance = hamming(key, candidate)
+            if distance <= radius:
+                matches.extend((distance, value) for value in self.values[candidate])
+        matches.sort(key=lambda match: match[0])
+        return matches
+
+    def __len__(self):
+        return sum(len(values) for values in self.values.values())
+
+
+class DuplicateIndex:
+    """
+    History of image analyses indexed by perceptual hash
+
+    Each entry stores the analysis results of an image and the options they
+    were produced with. find() returns the closest earlier entry within
+    max_distance bits that was analyzed with the same options, so
+    re-uploaded or slightly edited images can reuse previous results but a
+    preview-resolution result is never served for a full-resolution request.
+    Only the newest max_entries are kept. Entries are appended to a JSON
+    lines file when history_path is set, reloaded on start, and the file is
+    compacted to the kept entries once it reaches twice that many lines.
+    """
+
+    def __init__(self, history_path=None, method='phash', max_distance=6, max_entries=5000):
+        self.history_path = history_path
+        self.method = method
+        self.max_distance = max_distance
+        self.max_entries = max_entries
+        self.index = MultiIndexHash(bits=64, max_distance=max_distance)
+        self.entries = deque()  # (key, entry), oldest first
+        self._file_lines = 0
+        self._lock = Lock()
+        if history_path and os.path.exists(history_path):
+            self._load()
+
+    def _load(self):
+        with open(self.history_path, encoding='utf-8') as f:
+            for line in f:
+                if line.strip():
+                    self._file_lines += 1
+                    entry = json.loads(line)
+                    if entry.get('method') == self.method:
+                        self._insert(int(entry['hash'], 16), entry)
+        if self._file_lines >= 2 * self.max_entries:
+            self._compact()
+
+    def _insert(self, key, entry):
+        self.index.add(key, entry)
+        self.entries.append((key, entry))
+        while len(self.entries) > self.max_entries:
+            self.index.remove(*self.entries.popleft())
+
+    def _compact(self):
+        """Rewrite the history file with only the kept entries"""
+        tmp_path = f"{self.history_path}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            for _, entry in self.entries:
+                f.write(json.dumps(entry, default=str) + '\n')
+        os.replace(tmp_path, self.history_path)
+        self._file_lines = len(self.entries)
+
+    def fingerprint(self, image_or_path):
+        """Hash an image array, file or encoded bytes (decoded at reduced size for speed)"""
+        if isinstance(image_or_path, str):
+            image = cv2.imread(image_or_path, cv2.IMREAD_REDUCED_GRAYSCALE_4)
+            if image is None:
+                raise ValueError(f"Failed to decode {image_or_path}")
+        elif isinstance(image_or_path, (bytes, bytearray, memoryview)):
+            image = cv2.imdecode(np.frombuffer(image_or_path, np.uint8), cv2.IMREAD_REDUCED_GRAYSCALE_4)
+            if image is None:
+                raise ValueError("Failed to decode image bytes")
+        else:
+            image = image_or_path
+        return HASH_FUNCTIONS[self.method](image)
+
+    def find(self, key, max_distance=None, options=None):
+        """Closest stored entry within max_distance bits recorded with the same options, or None"""
+        limit = self.max_distance if max_distance is None else max_distance
+        with self._lock:
+            matches = self.index.search(key, limit)
+        for distance, entry in matches:
+            if entry.get('options') == options:
+                return dict(entry, distance=distance)
+        return None
+
+    def add(self, key, path, results, options=None):
+        """Record the analysis results for an image hash"""
+        entry = {
+            'hash': format(key, 'x'),
+            'method': self.method,
+            'path': path,
+            'options': options,
+            'timestamp': time.time(),
+            'results': results
+        }
+        with self._lock:
+            self._insert(key, entry)
+            if self.history_path:
+                os.makedirs(os.path.dirname(self.history_path) or '.', exist_ok=True)
+                with open(self.history_path, 'a', encoding='utf-8') as f:
+                    f.write(json.dumps(entry, default=str) + '\n')
+                self._file_lines += 1
+                if self._file_lines >= 2 * self.max_entries:
+                    self._compact()
+        return entry
+
+    def __len__(self):
+        return len(self.index)
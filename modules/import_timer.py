@@ -0,0 +1,31 @@
+import sys
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+
+# label -> {'seconds', 'modules'}, first (cold) import of each group only
+IMPORT_TIMES = OrderedDict()
+
+
+@contextmanager
+def timed_imports(label):
+    """
+    Record how long the imports in the block take the first time they run
+
+    Later runs find the modules in sys.modules and cost nothing, so only
+    a block that actually loaded new modules is recorded.
+    """
+    before = len(sys.modules)
+    started = time.perf_counter()
+    yield
+    loaded = len(sys.modules) - before
+    if loaded and label not in IMPORT_TIMES:
+        IMPORT_TIMES[label] = {
+            'seconds': round(time.perf_counter() - started, 3),
+            'modules': loaded
+        }
+
+
+def import_report():
+    """Recorded import groups, in load order"""
+    return [{'group': label, **timing} for label, timing in IMPORT_TIMES.items()]
@@ -0,0 +1,231 @@
+import os
+import io
+import time
+import pstats
+import logging
+import cProfile
+import functools
+import tracemalloc
+from collections import OrderedDict, deque
+from contextlib import contextmanager
+from contextvars import ContextVar
+from threading import Lock
+
+MB = 1024 ** 2
+
+logger = logging.getLogger('smart_insight')
+
+# Library mode is silent; the module demos (python modules/x.py) and
+# SMART_INSIGHT_VERBOSE=1 turn the console report back on
+_verbose = os.getenv('SMART_INSIGHT_VERBOSE', '').lower() in ('1', 'true', 'yes')
+
+# Default profiler for trace(): '' (spans only), 'cpu' or 'memory'
+PROFILE_MODE = os.getenv('SMART_INSIGHT_PROFILE', '').lower()
+
+_current = ContextVar('smart_insight_trace', default=None)
+_totals_lock = Lock()
+# tracemalloc is process-wide: one memory-profiled trace at a time
+_memory_lock = Lock()
+SPAN_TOTALS = OrderedDict()  # span name -> calls / seconds / max_seconds, process-wide
+RECENT_TRACES = deque(maxlen=50)
+
+
+# ===========================
+# Console output
+# ===========================
+def set_verbose(enabled=True):
+    global _verbose
+    _verbose = enabled
+
+
+def is_verbose():
+    return _verbose
+
+
+def say(*args, **kwargs):
+    """print(), but only in verbose mode"""
+    if _verbose:
+        print(*args, **kwargs)
+
+
+def banner(title, width=80):
+    if _verbose:
+        print("\n" + "=" * width)
+        print(title)
+        print("=" * width)
+
+
+def warn(message):
+    """Problems are reported in every mode, through logging"""
+    logger.warning(message)
+
+
+# ===========================
+# Spans and traces
+# ===========================
+class Trace:
+    """Spans (and optionally a profile) collected during one analysis"""
+
+    def __init__(self, name, profile=''):
+        self.name = name
+        self.profile = profile
+        self.spans = []  # (name, depth, start, seconds, allocated bytes or None)
+        self.depth = 0
+        self.seconds = None
+        self.peak_mb = None
+        self.hotspots = []
+
+    def summary(self):
+        """Time (and memory) per span name, in order of first start (outer before inner)"""
+        by_name = OrderedDict()
+        for name, depth, _, seconds, allocated in sorted(self.spans, key=lambda s: s[2]):
+            entry = by_name.setdefault(name, {
+                'name': name, 'depth': depth, 'calls': 0, 'seconds': 0.0, 'allocated_mb': None
+            })
+            entry['calls'] += 1
+            entry['seconds'] += seconds
+            if allocated is not None:
+                entry['allocated_mb'] = (entry['allocated_mb'] or 0.0) + allocated / MB
+        spans = []
+        for entry in by_name.values():
+            entry['seconds'] = round(entry['seconds'], 4)
+            entry['share'] = round(entry['seconds'] / self.seconds, 3) if self.seconds else None
+            if entry['allocated_mb'] is not None:
+                entry['allocated_mb'] = round(entry['allocated_mb'], 2)
+            spans.append(entry)
+        return {
+            'name': self.name,
+            'seconds': round(self.seconds or 0.0, 4),
+            'profile': self.profile or None,
+            'peak_mb': self.peak_mb,
+            'spans': spans,
+            'hotspots': self.hotspots
+        }
+
+
+def _add_total(name, seconds):
+    with _totals_lock:
+        total = SPAN_TOTALS.setdefault(name, {'calls': 0, 'seconds': 0.0, 'max_seconds': 0.0})
+        total['calls'] += 1
+        total['seconds'] += seconds
+        total['max_seconds'] = max(total['max_seconds'], seconds)
+
+
+@contextmanager
+def span(name):
+    """Time a block; recorded in the active trace and in SPAN_TOTALS"""
+    trace = _current.get()
+    memory = trace is not None and trace.profile == 'memory' and tracemalloc.is_tracing()
+    before = tracemalloc.get_traced_memory()[0] if memory else 0
+    if trace is not None:
+        trace.depth += 1
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        seconds = time.perf_counter() - started
+        _add_total(name, seconds)
+        if trace is not None:
+            trace.depth -= 1
+            allocated = tracemalloc.get_traced_memory()[0] - before if memory else None
+            trace.spans.append((name, trace.depth, started, seconds, allocated))
+
+
+def timed(fn):
+    """Decorator: run the method in a span named after it (e.g. TextAnalyzer.extract_keywords)"""
+    name = fn.__qualname__
+
+    @functools.wraps(fn)
+    def wrapper(*args, **kwargs):
+        with span(name):
+            return fn(*args, **kwargs)
+    return wrapper
+
+
+def _hotspots(profiler, limit=15):
+    stats = pstats.Stats(profiler, stream=io.StringIO())
+    rows = sorted(stats.stats.items(), key=lambda item: item[1][2], reverse=True)[:limit]
+    return [{
+        'function': f"{os.path.basename(filename)}:{line}({function})",
+        'calls': calls,
+        'self_seconds': round(self_time, 4),
+        'cumulative_seconds': round(cumulative, 4)
+    } for (filename, line, function), (_, calls, self_time, cumulative, _) in rows]
+
+
+@contextmanager
+def trace(name, profile=None):
+    """
+    Collect the spans of one analysis and add its summary to RECENT_TRACES
+
+    profile: '' for spans only, 'cpu' for a cProfile of the block (top
+    functions by self time) or 'memory' for tracemalloc peak and per-span
+    allocations. Defaults to SMART_INSIGHT_PROFILE. Profiling slows the
+    analysis down, so it is off unless asked for.
+
+    tracemalloc counts the whole process, so only one trace is memory-
+    profiled at a time; a trace that starts while another holds it gets
+    spans only (its summary says profile None) and a warning. Figures can
+    still include allocations made meanwhile by other threads.
+    """
+    current = Trace(name, PROFILE_MODE if profile is None else profile)
+    memory = current.profile == 'memory' and _memory_lock.acquire(blocking=False)
+    if current.profile == 'memory' and not memory:
+        warn(f"{name}: another trace is memory-profiling; recording spans only")
+        current.profile = ''
+    token = _current.set(current)
+
+    profiler = None
+    if current.profile == 'cpu':
+        profiler = cProfile.Profile()
+        try:
+            profiler.enable()
+        except ValueError:  # another profiler is already active on this thread
+            profiler = None
+    started_tracing = memory and not tracemalloc.is_tracing()
+    if started_tracing:
+        tracemalloc.start()
+    if memory:
+        tracemalloc.reset_peak()
+
+    started = time.perf_counter()
+    try:
+        yield current
+    finally:
+        current.seconds = time.perf_counter() - started
+        if profiler is not None:
+            profiler.disable()
+            current.hotspots = _hotspots(profiler)
+        if memory:
+            current.peak_mb = round(tracemalloc.get_traced_memory()[1] / MB, 2)
+            if started_tracing:
+                tracemalloc.stop()
+            _memory_lock.release()
+        _current.reset(token)
+        summary = current.summary()
+        RECENT_TRACES.append(summary)
+        say(format_report(summary))
+
+
+def span_totals():
+    with _totals_lock:
+        return [{'name': name, **{k: round(v, 4) for k, v in total.items()}}
+                for name, total in SPAN_TOTALS.items()]
+
+
+def format_report(summary):
+    """Plain-text table of one trace summary"""
+    header = f"⏱️  {summary['name']}: {summary['seconds']:.3f}s"
+    if summary['peak_mb'] is not None:
+        header += f" · peak {summary['peak_mb']:.1f} MB"
+    lines = [header]
+    for entry in summary['spans']:
+        memory = f" {entry['allocated_mb']:+8.2f} MB" if entry['allocated_mb'] is not None else ""
+        share = f"{entry['share']:6.1%}" if entry['share'] is not None else ""
+        lines.append(f"  {'  ' * entry['depth']}{entry['name']:<{44 - 2 * entry['depth']}}"
+                     f"{entry['calls']:>4}x {entry['seconds']:9.4f}s {share}{memory}")
+    if summary['hotspots']:
+        lines.append("  Hotspots (self time):")
+        lines.extend(f"    {h['self_seconds']:8.4f}s {h['calls']:>7}  {h['function']}"
+                     for h in summary['hotspots'][:10])
+    return "\n".join(lines)
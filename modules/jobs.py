@@ -0,0 +1,161 @@
+import time
+import uuid
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from threading import Event, Lock
+
+ACTIVE_STATES = ('queued', 'running')
+
+
+class JobCancelled(BaseException):
+    """
+    Raised inside a job at its next progress report after cancel()
+
+    A BaseException (like asyncio.CancelledError) so the analyzers'
+    broad `except Exception` handlers don't swallow it.
+    """
+
+
+class Job:
+    """
+    One background analysis
+
+    The work function receives the job and calls report() between steps;
+    report() records progress and partial results and is also where a
+    cancellation request takes effect.
+    """
+
+    def __init__(self, kind):
+        self.id = uuid.uuid4().hex[:12]
+        self.kind = kind
+        self.status = 'queued'
+        self.step = 'queued'
+        self.progress = 0.0
+        self.partial = {}
+        self.result = None
+        self.error = None
+        self.created = time.time()
+        self.started = None
+        self.finished = None
+        self.future = None
+        self._cancel = Event()
+        self._lock = Lock()
+
+    def report(self, step, progress=None, **partial):
+        """Record progress (0-1) and partial results; raises JobCancelled if cancelled"""
+        if self._cancel.is_set():
+            raise JobCancelled(self.id)
+        with self._lock:
+            self.step = step
+            if progress is not None:
+                self.progress = max(self.progress, min(1.0, progress))
+            self.partial.update(partial)
+
+    def drop_result(self):
+        """Forget the result; the job stays listed with its status"""
+        with self._lock:
+            self.result = None
+
+    def cancel(self):
+        """Request cancellation; a queued job never starts, a running one stops at its next report()"""
+        self._cancel.set()
+        if self.future is not None and self.future.cancel():
+            self._finish('cancelled')
+
+    @property
+    def cancelled(self):
+        return self._cancel.is_set()
+
+    def _finish(self, status, result=None, error=None):
+        with self._lock:
+            self.status = status
+            self.result = result
+            self.error = error
+            self.finished = time.time()
+            if status == 'done':
+                self.progress = 1.0
+
+    def snapshot(self):
+        """Thread-safe copy of the job's state for display"""
+        with self._lock:
+            end = self.finished or time.time()
+            return {
+                'id': self.id,
+                'kind': self.kind,
+                'status': self.status,
+                'step': self.step,
+                'progress': round(self.progress, 3),
+                'partial': dict(self.partial),
+                'error': self.error,
+                'elapsed_seconds': round(end - (self.started or end), 2)
+            }
+
+
+class JobManager:
+    """
+    Bounded worker pool for long analyses, addressed by job ID
+
+    Threads rather than processes: the heavy parts (OpenCV, pandas,
+    Tesseract) release the GIL, and jobs can report progress and share
+    caches without pickling. Only the most recent max_jobs finished jobs
+    are kept, and only the most recent max_results of them keep their
+    results: results can be large (whole analyzers), so callers that
+    need them longer should store them elsewhere, e.g. in a ResultMemo.
+    """
+
+    def __init__(self, max_workers=2, max_jobs=100, max_results=2):
+        self.executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='job')
+        self.max_jobs = max_jobs
+        self.max_results = max_results
+        self.jobs = OrderedDict()
+        self._lock = Lock()
+
+    def _run(self, job, fn, args, kwargs):
+        if job.cancelled:
+            job._finish('cancelled')
+            return
+        with job._lock:
+            job.status = 'running'
+            job.started = time.time()
+        try:
+            result = fn(job, *args, **kwargs)
+        except JobCancelled:
+            job._finish('cancelled')
+        except Exception as e:
+            job._finish('failed', error=str(e))
+        else:
+            job._finish('done', result=result)
+            with self._lock:
+                self._prune()
+
+    def submit(self, kind, fn, *args, **kwargs):
+        """Run fn(job, *args, **kwargs) in the pool; returns the job ID"""
+        job = Job(kind)
+        with self._lock:
+            self.jobs[job.id] = job
+            self._prune()
+        job.future = self.executor.submit(self._run, job, fn, args, kwargs)
+        return job.id
+
+    def _prune(self):
+        finished = [job_id for job_id, job in self.jobs.items() if job.status not in ACTIVE_STATES]
+        for job_id in finished[:max(0, len(self.jobs) - self.max_jobs)]:
+            del self.jobs[job_id]
+        holding = [job for job in self.jobs.values() if job.result is not None]
+        for job in holding[:max(0, len(holding) - self.max_results)]:
+            job.drop_result()
+
+    def get(self, job_id):
+        with self._lock:
+            return self.jobs.get(job_id)
+
+    def cancel(self, job_id):
+        job = self.get(job_id)
+        if job is not None:
+            job.cancel()
+        return job
+
+    def list(self):
+        with self._lock:
+            jobs = list(self.jobs.values())
+        return [job.snapshot() for job in jobs]
@@ -0,0 +1,85 @@
+try:
+    from modules.rate_limiter import estimate_tokens
+except ImportError:  # running as a script from inside modules/
+    from rate_limiter import estimate_tokens
+
+
+class PromptBuilder:
+    """
+    Assemble a prompt under a fixed token budget
+
+    The header and footer (instructions) are always kept. Sections are
+    added in priority order and each one takes what is left of the budget:
+    item lists keep as many leading items as fit, free text is cut at a
+    word boundary. Truncation depends only on the input, so the same input
+    always gives the same prompt.
+    """
+
+    def __init__(self, budget_tokens, header='', footer=''):
+        self.header = header.strip()
+        self.footer = footer.strip()
+        self.remaining = budget_tokens - estimate_tokens(self.header) - estimate_tokens(self.footer)
+        self.sections = []
+
+    def _take(self, text):
+        self.sections.append(text)
+        self.remaining -= estimate_tokens(text) + 1  # + newline
+
+    def add_line(self, label, value):
+        """Add a short 'Label: value' line if it fits"""
+        line = f"{label}: {value}"
+        if estimate_tokens(line) < self.remaining:
+            self._take(line)
+            return True
+        return False
+
+    def add_items(self, label, items, separator=', ', max_tokens=None):
+        """
+        Add as many leading items as fit, noting how many were dropped
+
+        max_tokens caps this section's share of the budget so one long
+        list cannot crowd out the sections after it.
+        """
+        items = [str(item) for item in items]
+        if not items:
+            return 0
+        limit = self.remaining if max_tokens is None else min(max_tokens, self.remaining)
+        prefix = f"{label}: "
+        # Leave room for the "(+N more)" marker
+        room = (limit - 4) * 4  # chars
+        kept = []
+        used = len(prefix)
+        for item in items:
+            cost = len(item) + len(separator)
+            if used + cost > room:
+                break
+            kept.append(item)
+            used += cost
+        if not kept:
+            return 0
+        line = prefix + separator.join(kept)
+        if len(kept) < len(items):
+            line += f"{separator}(+{len(items) - len(kept)} more)"
+        self._take(line)
+        return len(kept)
+
+    def add_text(self, label, text, max_tokens=None):
+        """Add free text, cut at a word boundary to fit the budget"""
+        text = ' '.join(str(text).split())
+        limit = self.remaining if max_tokens is None else min(max_tokens, self.remaining)
+        prefix = f"{label}: "
+        room = (limit - 2) * 4 - len(prefix)  # chars
+        if room <= 0 or not text:
+            return False
+        if len(text) > room:
+            cut = text[:room].rsplit(' ', 1)[0]
+            text = cut + ' …'
+        self._take(prefix + text)
+        return True
+
+    def build(self):
+        parts = [self.header, ''] if self.header else []
+        parts.extend(self.sections)
+        if self.footer:
+            parts.extend(['', self.footer])
+        return '\n'.join(parts) + '\n'
@@ -0,0 +1,61 @@
+import time
+import asyncio
+from threading import Lock
+
+
+def estimate_tokens(text):
+    """Rough token count (~4 characters per token for English text)"""
+    return max(1, len(text) // 4)
+
+
+class TokenBucket:
+    """Token bucket refilled continuously at `rate` tokens per second"""
+
+    def __init__(self, rate, capacity):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = time.monotonic()
+
+    def refill(self, now):
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def wait_time(self, amount):
+        """Seconds until `amount` tokens are available (0 if they are now)"""
+        return max(0.0, (amount - self.tokens) / self.rate)
+
+
+class RateLimiter:
+    """
+    Requests-per-second and tokens-per-minute limiter
+
+    acquire() waits until both buckets can cover the request and then takes
+    from both at once, so a request never holds one budget while blocked
+    on the other. Safe to share between threads and event loops.
+    """
+
+    def __init__(self, requests_per_second, tokens_per_minute):
+        self.requests = TokenBucket(requests_per_second, max(1.0, requests_per_second))
+        self.tokens = TokenBucket(tokens_per_minute / 60.0, tokens_per_minute)
+        self._lock = Lock()
+
+    def _try_acquire(self, tokens):
+        tokens = min(tokens, self.tokens.capacity)
+        with self._lock:
+            now = time.monotonic()
+            self.requests.refill(now)
+            self.tokens.refill(now)
+            wait = max(self.requests.wait_time(1), self.tokens.wait_time(tokens))
+            if wait == 0:
+                self.requests.tokens -= 1
+                self.tokens.tokens -= tokens
+            return wait
+
+    async def acquire(self, tokens=1):
+        """Wait (without blocking the event loop) for one request slot"""
+        while True:
+            wait = self._try_acquire(tokens)
+            if wait == 0:
+                return
+            await asyncio.sleep(wait)
@@ -0,0 +1,247 @@
+import time
+import random
+import http.client
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, TimeoutError as FutureTimeout, wait
+from threading import Lock
+
+# HTTP statuses worth retrying: rate limited or a transient server failure
+RETRYABLE_STATUS = {408, 429, 500, 502, 503, 504}
+
+# Transport failures worth retrying (socket.timeout is TimeoutError)
+RETRYABLE_ERRORS = (TimeoutError, ConnectionError, http.client.HTTPException)
+
+# Marks the end of a stream pulled through the executor
+_END = object()
+
+# Attempts run here so a stuck call can be abandoned at its deadline
+_EXECUTOR = ThreadPoolExecutor(max_workers=16, thread_name_prefix='ai-call')
+
+
+class CircuitOpenError(RuntimeError):
+    """Raised instead of calling an upstream that keeps failing"""
+
+
+def is_retryable(error):
+    """
+    Retry timeouts, connection errors and 408/429/5xx
+
+    Everything else - other 4xx, the SDK's ValueError on a blocked or empty
+    response, programming errors - would fail the same way again.
+    """
+    code = getattr(error, 'code', None)  # HTTP status on REST and google.api_core errors
+    if isinstance(code, int):
+        return code in RETRYABLE_STATUS
+    return isinstance(error, RETRYABLE_ERRORS)
+
+
+class LatencyTracker:
+    """Sliding window of successful call latencies"""
+
+    def __init__(self, window=200):
+        self.samples = deque(maxlen=window)
+        self._lock = Lock()
+
+    def record(self, seconds):
+        with self._lock:
+            self.samples.append(seconds)
+
+    def percentile(self, q, min_samples=20):
+        """q-th percentile (0-100) in seconds, or None until min_samples are in"""
+        with self._lock:
+            if len(self.samples) < min_samples:
+                return None
+            ordered = sorted(self.samples)
+        return ordered[min(len(ordered) - 1, int(len(ordered) * q / 100))]
+
+
+class CircuitBreaker:
+    """
+    Closed -> open after failure_threshold consecutive failures
+
+    While open every call is rejected. After reset_timeout seconds one
+    probe call is let through (half-open): success closes the breaker,
+    failure opens it for another reset_timeout.
+    """
+
+    def __init__(self, failure_threshold=5, reset_timeout=30.0):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.state = 'closed'
+        self.failures = 0
+        self.opened_at = 0.0
+        self._lock = Lock()
+
+    def allow(self):
+        with self._lock:
+            if self.state == 'closed':
+                return True
+            if self.state == 'open' and time.monotonic() - self.opened_at >= self.reset_timeout:
+                self.state = 'half_open'
+                return True
+            # Open, or half-open with the probe still in flight
+            return False
+
+    def record_success(self):
+        with self._lock:
+            self.state = 'closed'
+            self.failures = 0
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            if self.state == 'half_open' or self.failures >= self.failure_threshold:
+                self.state = 'open'
+                self.opened_at = time.monotonic()
+
+
+class ResilientClient:
+    """
+    Retries, deadlines, hedging and a circuit breaker around a blocking call
+
+    call(prompt) must return the response text or raise. Each generate()
+    is bounded by `deadline` seconds overall; retryable failures are
+    retried with exponential backoff and full jitter. With hedge=True, an
+    attempt still running after the observed p95 latency is raced against
+    one duplicate request and the first success wins. Calls that miss
+    their deadline are abandoned, not killed - their thread finishes in
+    the background.
+
+    stream() applies the same policy until the first chunk arrives, within
+    first_chunk_timeout (hedged at the p95 time to first chunk); after that
+    each chunk must follow the previous one within idle_timeout. Stalls
+    count as failures for the breaker.
+    """
+
+    def __init__(self, call, retries=2, backoff=0.5, max_backoff=8.0, deadline=30.0,
+                 hedge=False, hedge_percentile=95, breaker=None, latency=None, executor=None,
+                 first_chunk_timeout=None, idle_timeout=None):
+        self.call = call
+        self.retries = retries
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.deadline = deadline
+        self.first_chunk_timeout = deadline if first_chunk_timeout is None else first_chunk_timeout
+        self.idle_timeout = deadline if idle_timeout is None else idle_timeout
+        self.hedge = hedge
+        self.hedge_percentile = hedge_percentile
+        self.breaker = breaker or CircuitBreaker()
+        self.latency = latency or LatencyTracker()
+        self.first_chunk_latency = LatencyTracker()
+        self.executor = executor or _EXECUTOR
+        self.retried = 0
+        self.hedged = 0
+
+    def _timed_call(self, fn, latency):
+        started = time.monotonic()
+        result = fn()
+        latency.record(time.monotonic() - started)
+        return result
+
+    def _attempt(self, fn, timeout, stats, latency):
+        """One attempt (plus at most one hedge), bounded by timeout seconds"""
+        started = time.monotonic()
+        pending = {self.executor.submit(self._timed_call, fn, latency)}
+        hedge_at = latency.percentile(self.hedge_percentile) if self.hedge else None
+        error = None
+
+        while pending:
+            elapsed = time.monotonic() - started
+            if elapsed >= timeout:
+                break
+            limit = timeout - elapsed
+            if hedge_at is not None:
+                limit = min(limit, max(0.0, hedge_at - elapsed))
+            done, pending = wait(pending, timeout=limit, return_when=FIRST_COMPLETED)
+            for future in done:
+                if future.exception() is None:
+                    return future.result()
+                error = future.exception()
+            if hedge_at is not None and pending and not done:
+                elapsed = time.monotonic() - started
+                if hedge_at <= elapsed < timeout:
+                    # Slower than p95 so far: race a duplicate request
+                    pending.add(self.executor.submit(self._timed_call, fn, latency))
+                    self.hedged += 1
+                    stats['hedges'] += 1
+                    hedge_at = None
+
+        if error is not None and not pending:
+            raise error
+        raise TimeoutError(f"no response within {timeout:.1f}s")
+
+    def _with_retries(self, fn, budget, stats, latency):
+        """fn() through _attempt, retried within `budget` seconds overall"""
+        deadline = time.monotonic() + budget
+        for attempt in range(self.retries + 1):
+            if not self.breaker.allow():
+                raise CircuitOpenError("upstream unavailable (circuit open)")
+            try:
+                result = self._attempt(fn, deadline - time.monotonic(), stats, latency)
+            except Exception as e:
+                retryable = is_retryable(e)
+                if retryable:
+                    self.breaker.record_failure()
+                else:
+                    # The upstream answered (or the fault is ours); not an outage
+                    self.breaker.record_success()
+                pause = random.uniform(0, min(self.max_backoff, self.backoff * 2 ** attempt))
+                if not retryable or attempt == self.retries or time.monotonic() + pause >= deadline:
+                    raise
+                self.retried += 1
+                stats['retries'] += 1
+                time.sleep(pause)
+                continue
+            self.breaker.record_success()
+            return result
+
+    def generate(self, prompt, stats=None):
+        """
+        Return the response text, raising CircuitOpenError or the last error
+
+        If a stats dict is given, this call's retry and hedge counts are
+        written to it.
+        """
+        stats = {} if stats is None else stats
+        stats.update(retries=0, hedges=0)
+        return self._with_retries(lambda: self.call(prompt), self.deadline, stats, self.latency)
+
+    def stream(self, factory, stats=None):
+        """
+        Yield chunks from factory(), retrying and hedging until the first one
+
+        Once text has been yielded a failure can't be retried transparently,
+        so later errors - including TimeoutError when the stream stalls for
+        idle_timeout - propagate to the caller.
+        """
+        stats = {} if stats is None else stats
+        stats.update(retries=0, hedges=0)
+
+        def first_chunk():
+            chunks = iter(factory())
+            return chunks, next(chunks, _END)
+
+        chunks, chunk = self._with_retries(first_chunk, self.first_chunk_timeout, stats,
+                                           self.first_chunk_latency)
+        while chunk is not _END:
+            yield chunk
+            # Pulled on the executor so a stalled upstream can be abandoned
+            future = self.executor.submit(next, chunks, _END)
+            try:
+                chunk = future.result(timeout=self.idle_timeout)
+            except FutureTimeout:
+                self.breaker.record_failure()
+                raise TimeoutError(f"stream stalled: no chunk for {self.idle_timeout:.1f}s") from None
+            except Exception as e:
+                if is_retryable(e):
+                    self.breaker.record_failure()
+                raise
+
+    def stats(self):
+        p95 = self.latency.percentile(95, min_samples=1)
+        return {
+            'breaker': self.breaker.state,
+            'retries': self.retried,
+            'hedges': self.hedged,
+            'p95_seconds': round(p95, 3) if p95 is not None else None
+        }
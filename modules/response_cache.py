@@ -0,0 +1,162 @@
+import os
+import json
+import time
+import hashlib
+from collections import OrderedDict
+from threading import Lock, get_ident
+
+
+def normalize_prompt(prompt):
+    """Collapse whitespace so formatting-only differences share a cache entry"""
+    return ' '.join(prompt.split())
+
+
+class ResponseCache:
+    """
+    Two-tier cache for AI responses
+
+    Tier 1 is an in-memory LRU, tier 2 a directory of JSON files. Both
+    expire entries after ttl_seconds. Keys hash the model, temperature and
+    normalized prompt, so repeat requests skip the API call entirely.
+    The directory is swept on startup and every sweep_every puts: expired
+    files go, then the oldest beyond max_disk_entries.
+    """
+
+    def __init__(self, cache_dir=None, max_entries=256, ttl_seconds=24 * 3600,
+                 max_disk_entries=10_000, sweep_every=100):
+        self.cache_dir = cache_dir
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.max_disk_entries = max_disk_entries
+        self.sweep_every = sweep_every
+        self.memory = OrderedDict()
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.disk_removed = 0
+        self._puts = 0
+        self._lock = Lock()
+        self._sweep_lock = Lock()
+        if cache_dir:
+            self.sweep()
+
+    @staticmethod
+    def make_key(model, temperature, prompt):
+        """Stable SHA-256 key for a request"""
+        payload = json.dumps([model, temperature, normalize_prompt(prompt)])
+        return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+    def _disk_path(self, key):
+        return os.path.join(self.cache_dir, key[:2], f"{key}.json")
+
+    def _remember(self, key, value, created):
+        self.memory[key] = (value, created)
+        self.memory.move_to_end(key)
+        while len(self.memory) > self.max_entries:
+            self.memory.popitem(last=False)
+
+    def get(self, key):
+        """Return the cached response for key, or None"""
+        now = time.time()
+        with self._lock:
+            entry = self.memory.get(key)
+            if entry is not None:
+                if now - entry[1] < self.ttl_seconds:
+                    self.memory.move_to_end(key)
+                    self.memory_hits += 1
+                    return entry[0]
+                del self.memory[key]
+
+        if self.cache_dir:
+            try:
+                with open(self._disk_path(key), encoding='utf-8') as f:
+                    stored = json.load(f)
+                if now - stored['created'] < self.ttl_seconds:
+                    with self._lock:
+                        self._remember(key, stored['response'], stored['created'])
+                        self.disk_hits += 1
+                    return stored['response']
+                os.remove(self._disk_path(key))
+            except (OSError, ValueError, KeyError):
+                pass
+
+        with self._lock:
+            self.misses += 1
+        return None
+
+    def put(self, key, value):
+        """Store a response in both tiers"""
+        created = time.time()
+        with self._lock:
+            self._remember(key, value, created)
+            self._puts += 1
+            sweep = self._puts % self.sweep_every == 0
+
+        if self.cache_dir:
+            path = self._disk_path(key)
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            # Write-then-rename so readers never see a partial file
+            tmp_path = f"{path}.{os.getpid()}.{get_ident()}.tmp"
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump({'response': value, 'created': created}, f)
+            os.replace(tmp_path, path)
+            if sweep:
+                self.sweep()
+
+    def sweep(self):
+        """
+        Delete expired disk entries, then the oldest beyond max_disk_entries
+
+        Files are aged by mtime, which put() sets when it writes them.
+        Leftover .tmp files from crashed writers expire the same way.
+        Returns the number of files removed.
+        """
+        if not self._sweep_lock.acquire(blocking=False):
+            return 0  # another thread is already sweeping
+        try:
+            entries, stale = [], []
+            cutoff = time.time() - self.ttl_seconds
+            for root, _, names in os.walk(self.cache_dir):
+                for name in names:
+                    path = os.path.join(root, name)
+                    try:
+                        mtime = os.stat(path).st_mtime
+                    except FileNotFoundError:
+                        continue
+                    if mtime < cutoff:
+                        stale.append(path)
+                    elif not name.endswith('.tmp'):  # in-flight writes don't count
+                        entries.append((mtime, path))
+            entries.sort()
+            stale += [path for _, path in entries[:max(0, len(entries) - self.max_disk_entries)]]
+            removed = 0
+            for path in stale:
+                try:
+                    os.remove(path)
+                    removed += 1
+                except FileNotFoundError:
+                    pass
+            with self._lock:
+                self.disk_removed += removed
+            return removed
+        finally:
+            self._sweep_lock.release()
+
+    def clear(self):
+        """Drop the in-memory tier and reset counters (disk entries expire by TTL)"""
+        with self._lock:
+            self.memory.clear()
+            self.memory_hits = self.disk_hits = self.misses = 0
+
+    def stats(self):
+        """Hit/miss counters"""
+        hits = self.memory_hits + self.disk_hits
+        total = hits + self.misses
+        return {
+            'memory_hits': self.memory_hits,
+            'disk_hits': self.disk_hits,
+            'misses': self.misses,
+            'hit_rate': round(hits / total, 3) if total else 0.0,
+            'entries': len(self.memory),
+            'disk_removed': self.disk_removed
+        }
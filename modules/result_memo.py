@@ -0,0 +1,120 @@
+import sys
+import hashlib
+from collections import OrderedDict
+from threading import Lock
+
+try:
+    from modules.single_flight import SingleFlight
+except ImportError:  # running as a script from inside modules/
+    from single_flight import SingleFlight
+
+
+def content_digest(data):
+    """SHA-256 of upload content (bytes, memoryview or str)"""
+    if isinstance(data, str):
+        data = data.encode('utf-8')
+    return hashlib.sha256(data).hexdigest()
+
+
+def approx_size(value, _depth=0):
+    """Rough memory footprint in bytes, used to bound the memo"""
+    # Looked up rather than imported: if pandas/numpy aren't loaded yet,
+    # value can't be one of their types, and importing them costs startup time
+    pd, np = sys.modules.get('pandas'), sys.modules.get('numpy')
+    if pd is not None and isinstance(value, pd.DataFrame):
+        return int(value.memory_usage(deep=True).sum())
+    if pd is not None and isinstance(value, pd.Series):
+        return int(value.memory_usage(deep=True))
+    if np is not None and isinstance(value, np.ndarray):
+        return value.nbytes
+    if isinstance(value, (bytes, bytearray, str)):
+        return sys.getsizeof(value)
+    if _depth > 4:
+        return sys.getsizeof(value)
+    if isinstance(value, dict):
+        return sys.getsizeof(value) + sum(
+            approx_size(k, _depth + 1) + approx_size(v, _depth + 1) for k, v in value.items()
+        )
+    if isinstance(value, (list, tuple, set)):
+        return sys.getsizeof(value) + sum(approx_size(v, _depth + 1) for v in value)
+    if hasattr(value, '__dict__'):
+        return sys.getsizeof(value) + approx_size(vars(value), _depth + 1)
+    return sys.getsizeof(value)
+
+
+class ResultMemo:
+    """
+    LRU memo of analysis results keyed by content hash and parameters
+
+    Keys are tuples such as ('csv', digest) or ('keywords', digest, 15).
+    The memo is bounded by both entry count and approximate bytes, evicting
+    least recently used entries first. Concurrent misses on the same key
+    compute once. None results and exceptions are never stored, so a
+    failed computation is retried on the next call. Stored values are
+    shared, so callers must not mutate them.
+    """
+
+    def __init__(self, max_bytes=256 * 1024 ** 2, max_entries=128):
+        self.max_bytes = max_bytes
+        self.max_entries = max_entries
+        self.entries = OrderedDict()
+        self.total_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self._lock = Lock()
+        self._flight = SingleFlight()
+
+    def get(self, key, default=None):
+        with self._lock:
+            if key not in self.entries:
+                return default
+            self.entries.move_to_end(key)
+            self.hits += 1
+            return self.entries[key][0]
+
+    def __contains__(self, key):
+        with self._lock:
+            return key in self.entries
+
+    def put(self, key, value):
+        if value is None:
+            return value  # a failed load/analysis; the next call retries it
+        size = approx_size(value)
+        if size > self.max_bytes:
+            return value  # would evict everything else; just don't keep it
+        with self._lock:
+            if key in self.entries:
+                self.total_bytes -= self.entries.pop(key)[1]
+            self.entries[key] = (value, size)
+            self.total_bytes += size
+            while len(self.entries) > self.max_entries or self.total_bytes > self.max_bytes:
+                self.total_bytes -= self.entries.popitem(last=False)[1][1]
+        return value
+
+    def get_or_compute(self, key, compute):
+        """Cached value for key, else compute(), store and return it"""
+        missing = object()
+        value = self.get(key, missing)
+        if value is not missing:
+            return value
+
+        def fill():
+            with self._lock:
+                self.misses += 1
+            return self.put(key, compute())
+
+        return self._flight.do(key, fill)
+
+    def clear(self):
+        with self._lock:
+            self.entries.clear()
+            self.total_bytes = 0
+            self.hits = self.misses = 0
+
+    def stats(self):
+        return {
+            'entries': len(self.entries),
+            'megabytes': round(self.total_bytes / 1024 ** 2, 2),
+            'hits': self.hits,
+            'misses': self.misses
+        }
@@ -0,0 +1,138 @@
+import contextvars
+from threading import Condition, Event, Lock, Thread
+
+
+class _Call:
+    """One in-flight call whose result is shared with waiting callers"""
+
+    def __init__(self):
+        self.done = Event()
+        self.result = None
+        self.error = None
+
+
+class _Stream:
+    """One in-flight stream; every caller replays its chunks as they arrive"""
+
+    def __init__(self):
+        self.chunks = []
+        self.finished = False
+        self.error = None
+        self.changed = Condition()
+
+    def append(self, chunk):
+        with self.changed:
+            self.chunks.append(chunk)
+            self.changed.notify_all()
+
+    def finish(self, error=None):
+        with self.changed:
+            self.finished = True
+            self.error = error
+            self.changed.notify_all()
+
+    def replay(self):
+        index = 0
+        while True:
+            with self.changed:
+                while index >= len(self.chunks) and not self.finished:
+                    self.changed.wait()
+                if index >= len(self.chunks):
+                    if self.error is not None:
+                        raise self.error
+                    return
+                chunk = self.chunks[index]
+            index += 1
+            yield chunk
+
+
+class SingleFlight:
+    """
+    Coalesce identical concurrent calls across threads
+
+    The first caller for a key (the leader) starts the upstream call; callers
+    arriving while it is in flight wait and receive the same result (or
+    exception, or stream of chunks) instead of issuing their own request.
+    """
+
+    def __init__(self):
+        self._lock = Lock()
+        self._calls = {}
+        self._streams = {}
+        self.leaders = 0
+        self.deduplicated = 0
+
+    def do(self, key, fn):
+        """Return fn() for key, sharing one execution between concurrent callers"""
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = _Call()
+                self.leaders += 1
+            else:
+                self.deduplicated += 1
+
+        if not leader:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result
+
+        try:
+            call.result = fn()
+            return call.result
+        except Exception as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.done.set()
+
+    def stream(self, key, factory):
+        """
+        Yield the chunks of factory() for key, sharing one upstream stream
+
+        The upstream is consumed on its own thread rather than by the first
+        caller, so a caller that stops iterating (a rerun, a disconnected
+        client) doesn't cut the stream short for the others. Errors from
+        the upstream are raised in every caller after the chunks before it.
+        """
+        with self._lock:
+            flight = self._streams.get(key)
+            leader = flight is None
+            if leader:
+                flight = self._streams[key] = _Stream()
+                self.leaders += 1
+            else:
+                self.deduplicated += 1
+
+        if leader:
+            # Copied context: the upstream still reports to the caller's trace
+            context = contextvars.copy_context()
+            Thread(target=context.run, args=(self._pump, key, flight, factory),
+                   name='single-flight-stream', daemon=True).start()
+        yield from flight.replay()
+
+    def _pump(self, key, flight, factory):
+        error = None
+        try:
+            for chunk in factory():
+                flight.append(chunk)
+        except Exception as e:
+            error = e
+        finally:
+            with self._lock:
+                del self._streams[key]
+            flight.finish(error)
+
+    def stats(self):
+        """Leader / deduplicated call counters"""
+        with self._lock:
+            in_flight = len(self._calls) + len(self._streams)
+        return {
+            'leaders': self.leaders,
+            'deduplicated': self.deduplicated,
+            'in_flight': in_flight
+        }
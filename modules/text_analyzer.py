@@ -5,11 +5,17 @@ from textblob import TextBlob
 from collections import Counter
 import numpy as np
 
+try:
+    from modules.instrumentation import banner, say, set_verbose, timed
+except ImportError:  # running as a script from inside modules/
+    from instrumentation import banner, say, set_verbose, timed
+
 class TextAnalyzer:
     """
     Analyze text - sentiment, keywords, summary, readability
     """
     
+    @timed
     def __init__(self, text):
         """Initialize with text content"""
         self.text = text
@@ -17,11 +23,10 @@ class TextAnalyzer:
         self.sentences = sent_tokenize(text)
         self.words = word_tokenize(text.lower())
     
+    @timed
     def get_basic_stats(self):
         """Get basic text statistics"""
-        print("\n" + "="*80)
-        print("📊 BASIC TEXT STATISTICS")
-        print("="*80)
+        banner("📊 BASIC TEXT STATISTICS")
         
         stats = {
             'character_count': len(self.text),
@@ -33,20 +38,19 @@ class TextAnalyzer:
         }
         
         # Display stats
-        print(f"  Characters: {stats['character_count']:,}")
-        print(f"  Words: {stats['word_count']:,}")
-        print(f"  Sentences: {stats['sentence_count']}")
-        print(f"  Unique Words: {stats['unique_words']:,}")
-        print(f"  Avg Word Length: {stats['avg_word_length']:.1f} characters")
-        print(f"  Avg Sentence Length: {stats['avg_sentence_length']:.1f} words")
+        say(f"  Characters: {stats['character_count']:,}")
+        say(f"  Words: {stats['word_count']:,}")
+        say(f"  Sentences: {stats['sentence_count']}")
+        say(f"  Unique Words: {stats['unique_words']:,}")
+        say(f"  Avg Word Length: {stats['avg_word_length']:.1f} characters")
+        say(f"  Avg Sentence Length: {stats['avg_sentence_length']:.1f} words")
         
         return stats
     
+    @timed
     def sentiment_analysis(self):
         """Analyze sentiment of the text"""
-        print("\n" + "="*80)
-        print("😊 SENTIMENT ANALYSIS")
-        print("="*80)
+        banner("😊 SENTIMENT ANALYSIS")
         
         sentiment = self.blob.sentiment
         
@@ -69,25 +73,24 @@ class TextAnalyzer:
         }
         
         # Display results
-        print(f"  {emoji} Sentiment: {classification.upper()}")
-        print(f"  Polarity: {result['polarity']:.3f} (range: -1 to 1)")
-        print(f"    -1 = Very Negative, 0 = Neutral, 1 = Very Positive")
-        print(f"  Subjectivity: {result['subjectivity']:.3f} (range: 0 to 1)")
-        print(f"    0 = Objective, 1 = Subjective")
-        print(f"  Confidence: {result['confidence']:.3f}")
+        say(f"  {emoji} Sentiment: {classification.upper()}")
+        say(f"  Polarity: {result['polarity']:.3f} (range: -1 to 1)")
+        say(f"    -1 = Very Negative, 0 = Neutral, 1 = Very Positive")
+        say(f"  Subjectivity: {result['subjectivity']:.3f} (range: 0 to 1)")
+        say(f"    0 = Objective, 1 = Subjective")
+        say(f"  Confidence: {result['confidence']:.3f}")
         
         return result
     
+    @timed
     def extract_keywords(self, top_n=10):
         """Extract most common keywords (excluding stop words)"""
-        print("\n" + "="*80)
-        print(f"🔑 TOP {top_n} KEYWORDS")
-        print("="*80)
+        banner(f"🔑 TOP {top_n} KEYWORDS")
         
         try:
             stop_words = set(stopwords.words('english'))
         except:
-            print("  Downloading stopwords...")
+            say("  Downloading stopwords...")
             nltk.download('stopwords', quiet=True)
             stop_words = set(stopwords.words('english'))
         
@@ -102,22 +105,21 @@ class TextAnalyzer:
         keywords = word_freq.most_common(top_n)
         
         # Display keywords
-        print("\n  Rank | Keyword        | Frequency")
-        print("  " + "-"*40)
+        say("\n  Rank | Keyword        | Frequency")
+        say("  " + "-"*40)
         for i, (word, freq) in enumerate(keywords, 1):
-            print(f"  {i:2d}   | {word:14s} | {freq:3d}")
+            say(f"  {i:2d}   | {word:14s} | {freq:3d}")
         
         return [{'word': word, 'frequency': freq} for word, freq in keywords]
     
+    @timed
     def extractive_summary(self, num_sentences=3):
         """Create extractive summary (most important sentences)"""
-        print("\n" + "="*80)
-        print(f"📝 EXTRACTIVE SUMMARY (Top {num_sentences} sentences)")
-        print("="*80)
+        banner(f"📝 EXTRACTIVE SUMMARY (Top {num_sentences} sentences)")
         
         if len(self.sentences) <= num_sentences:
             summary = ' '.join(self.sentences)
-            print("\n  (Text is short, showing all sentences)")
+            say("\n  (Text is short, showing all sentences)")
         else:
             # Score sentences based on word frequency
             word_freq = Counter(self.words)
@@ -136,24 +138,23 @@ class TextAnalyzer:
             summary = ' '.join([self.sentences[i] for i, _ in top_sentences])
         
         # Display summary
-        print("\n  " + "-"*76)
-        print(f"  {summary}")
-        print("  " + "-"*76)
+        say("\n  " + "-"*76)
+        say(f"  {summary}")
+        say("  " + "-"*76)
         
         return summary
     
+    @timed
     def readability_score(self):
         """Calculate readability metrics"""
-        print("\n" + "="*80)
-        print("📚 READABILITY ANALYSIS")
-        print("="*80)
+        banner("📚 READABILITY ANALYSIS")
         
         words = len(self.words)
         sentences = len(self.sentences)
         syllables = sum(self._count_syllables(word) for word in self.words)
         
         if sentences == 0 or words == 0:
-            print("  ⚠️ Text too short for readability analysis")
+            say("  ⚠️ Text too short for readability analysis")
             return None
         
         # Flesch Reading Ease Score
@@ -186,12 +187,12 @@ class TextAnalyzer:
         }
         
         # Display results
-        print(f"  Flesch Reading Ease: {result['flesch_score']:.1f}")
-        print(f"  Difficulty Level: {difficulty}")
-        print(f"  Grade Level: {grade_level}")
-        print(f"\n  💡 Interpretation:")
-        print(f"     Higher Flesch score = Easier to read")
-        print(f"     Grade level = Years of education needed")
+        say(f"  Flesch Reading Ease: {result['flesch_score']:.1f}")
+        say(f"  Difficulty Level: {difficulty}")
+        say(f"  Grade Level: {grade_level}")
+        say(f"\n  💡 Interpretation:")
+        say(f"     Higher Flesch score = Easier to read")
+        say(f"     Grade level = Years of education needed")
         
         return result
     
@@ -214,11 +215,10 @@ class TextAnalyzer:
         
         return max(1, syllable_count)
     
+    @timed
     def full_analysis(self):
         """Perform complete text analysis"""
-        print("\n" + "="*80)
-        print("📄 COMPLETE TEXT ANALYSIS")
-        print("="*80)
+        banner("📄 COMPLETE TEXT ANALYSIS")
         
         results = {
             'basic_stats': self.get_basic_stats(),
@@ -228,9 +228,7 @@ class TextAnalyzer:
             'readability': self.readability_score()
         }
         
-        print("\n" + "="*80)
-        print("✅ TEXT ANALYSIS COMPLETE")
-        print("="*80)
+        banner("✅ TEXT ANALYSIS COMPLETE")
         
         return results
 
@@ -240,6 +238,7 @@ class TextAnalyzer:
 # ===========================================
 
 if __name__ == "__main__":
+    set_verbose(True)
     print("="*80)
     print("🧠 SMART INSIGHT ENGINE - WEEK 2: TEXT ANALYSIS TEST")
     print("="*80)
@@ -0,0 +1,110 @@
+import cv2
+import numpy as np
+from PIL import Image
+
+try:
+    from modules.color_stats import ColorStatsAccumulator
+except ImportError:  # running as a script from inside modules/
+    from color_stats import ColorStatsAccumulator
+
+# Uncompressed PIL raw modes we can map straight from disk
+_RAW_CHANNEL_ORDER = {'BGR': 'bgr', 'RGB': 'rgb'}
+
+
+def open_memmap_image(path):
+    """
+    Open an image as a read-only BGR array without decoding it into memory
+
+    Works for uncompressed 8-bit RGB BMP / PPM / TGA / TIFF files, whose
+    pixel rows are mapped from disk. Returns None for formats that need a
+    full decode (JPEG, PNG, ...).
+    """
+    with Image.open(path) as img:
+        if img.mode != 'RGB' or len(img.tile) != 1:
+            return None
+        codec, extents, offset, args = img.tile[0]
+        width, height = img.size
+
+    if isinstance(args, str):
+        rawmode, stride, orientation = args, 0, 1
+    else:
+        rawmode, stride, orientation = (tuple(args) + (0, 1))[:3]
+    if codec != 'raw' or tuple(extents) != (0, 0, width, height) or rawmode not in _RAW_CHANNEL_ORDER:
+        return None
+
+    stride = stride or width * 3
+    rows = np.memmap(path, dtype=np.uint8, mode='r', offset=offset, shape=(height, stride))
+    image = rows[:, :width * 3].reshape(height, width, 3)
+    if orientation < 0:
+        image = image[::-1]  # bottom-up rows (BMP, TGA)
+    if _RAW_CHANNEL_ORDER[rawmode] == 'rgb':
+        image = image[:, :, ::-1]
+    return image
+
+
+def iter_tiles(height, width, tile_size, overlap=0):
+    """
+    Yield (core, padded, inner) slice pairs covering an image in tiles
+
+    core is the non-overlapping region of the tile in image coordinates,
+    padded extends it by `overlap` pixels on each side (clipped to the
+    image) and inner locates the core inside the padded tile.
+    """
+    for y in range(0, height, tile_size):
+        for x in range(0, width, tile_size):
+            y1, x1 = min(y + tile_size, height), min(x + tile_size, width)
+            py0, px0 = max(y - overlap, 0), max(x - overlap, 0)
+            py1, px1 = min(y1 + overlap, height), min(x1 + overlap, width)
+            core = (slice(y, y1), slice(x, x1))
+            padded = (slice(py0, py1), slice(px0, px1))
+            inner = (slice(y - py0, y1 - py0), slice(x - px0, x1 - px0))
+            yield core, padded, inner
+
+
+def _gray_histogram(gray):
+    return cv2.calcHist([gray], [0], None, [256], [0, 256]).ravel().astype(np.int64)
+
+
+def pixel_statistics(image, tile_size=None, overlap=16, bins_per_channel=8,
+                     canny_low=100, canny_high=200):
+    """
+    Fused single-pass color, grayscale and edge statistics
+
+    In-memory frames feed the color accumulator through row-chunk views and
+    build a single grayscale frame for Canny, so no RGB or pixel-list copy
+    is made. With tile_size, the image is walked once in tiles: each tile
+    feeds the accumulator and is run through grayscale + Canny with an
+    `overlap` pixel margin, counting only the tile core. Edge chains that
+    cross tile borders can be cut by hysteresis, so tiled edge counts may
+    read slightly low (~2% on noisy photos).
+    """
+    height, width = image.shape[:2]
+    colors = ColorStatsAccumulator(bins_per_channel)
+
+    if tile_size is None:
+        colors.update(image)
+        gray = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
+        gray_counts = _gray_histogram(gray)
+        edge_pixels = int(np.count_nonzero(cv2.Canny(gray, canny_low, canny_high)))
+    else:
+        gray_counts = np.zeros(256, dtype=np.int64)
+        edge_pixels = 0
+        for core, padded, inner in iter_tiles(height, width, tile_size, overlap):
+            tile = np.ascontiguousarray(image[padded])
+            colors.update(tile[inner])
+
+            gray = cv2.cvtColor(tile, cv2.COLOR_BGR2GRAY)
+            gray_counts += _gray_histogram(np.ascontiguousarray(gray[inner]))
+            edges = cv2.Canny(gray, canny_low, canny_high)
+            edge_pixels += int(np.count_nonzero(edges[inner]))
+
+    stats = colors.result()
+    total = max(stats['pixel_count'], 1)
+    stats.update({
+        'gray_histogram': gray_counts,
+        'gray_mean': float(gray_counts @ np.arange(256) / total),
+        'edge_pixels': edge_pixels,
+        'total_pixels': height * width,
+        'edge_density': edge_pixels / total
+    })
+    return stats
@@ -0,0 +1,86 @@
+import io
+import os
+
+
+def is_path(source):
+    return isinstance(source, (str, os.PathLike))
+
+
+def buffer_of(source):
+    """
+    Bytes-like view of an in-memory upload, without copying it
+
+    BytesIO objects (Streamlit's UploadedFile is one) are read with
+    getvalue(), which CPython returns without a copy while the stream is
+    unmodified; bytes, bytearray and memoryview are used as they are.
+    """
+    if isinstance(source, io.BytesIO):
+        return source.getvalue()
+    if isinstance(source, (bytes, bytearray, memoryview)):
+        return source
+    raise TypeError(f"Expected a path or bytes-like upload, got {type(source).__name__}")
+
+
+class BufferReader(io.RawIOBase):
+    """Seekable read-only file over a bytes-like buffer (no up-front copy)"""
+
+    def __init__(self, buffer):
+        self.view = memoryview(buffer).cast('B')
+        self.position = 0
+
+    def readable(self):
+        return True
+
+    def seekable(self):
+        return True
+
+    def readinto(self, target):
+        n = max(0, min(len(target), len(self.view) - self.position))
+        target[:n] = self.view[self.position:self.position + n]
+        self.position += n
+        return n
+
+    def seek(self, offset, whence=io.SEEK_SET):
+        base = {io.SEEK_SET: 0, io.SEEK_CUR: self.position, io.SEEK_END: len(self.view)}[whence]
+        self.position = max(0, base + offset)
+        return self.position
+
+    def tell(self):
+        return self.position
+
+
+class ProgressReader(io.RawIOBase):
+    """Wraps a binary file and calls callback(bytes_read) as it is consumed"""
+
+    def __init__(self, raw, callback):
+        self.raw = raw
+        self.callback = callback
+        self.bytes_read = 0
+
+    def readable(self):
+        return True
+
+    def readinto(self, target):
+        n = self.raw.readinto(target)
+        self.bytes_read += n or 0
+        self.callback(self.bytes_read)
+        return n
+
+    def close(self):
+        self.raw.close()
+        super().close()
+
+
+def source_size(source):
+    """Size in bytes of a path or in-memory upload"""
+    if is_path(source):
+        return os.path.getsize(source)
+    return memoryview(buffer_of(source)).nbytes
+
+
+def open_source(source):
+    """Binary file object for a path or an in-memory upload"""
+    if is_path(source):
+        return open(source, 'rb')
+    return BufferReader(buffer_of(source))
+
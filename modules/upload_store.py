@@ -0,0 +1,196 @@
+import os
+import time
+import uuid
+import hashlib
+from collections import OrderedDict, namedtuple
+from concurrent.futures import ThreadPoolExecutor
+from threading import Lock
+
+try:
+    from modules.upload_buffer import buffer_of, is_path
+except ImportError:  # running as a script from inside modules/
+    from upload_buffer import buffer_of, is_path
+
+CHUNK_SIZE = 1024 * 1024
+
+# Temp files older than this are leftovers of a crashed writer. Younger ones
+# may be in-flight writes of another process sharing the folder (api.py, a
+# second Streamlit worker), so they are left alone.
+STALE_TMP_SECONDS = 3600
+
+# Background writer for put_async
+_STORE_EXECUTOR = ThreadPoolExecutor(max_workers=2, thread_name_prefix='upload-store')
+
+StoredUpload = namedtuple('StoredUpload', 'digest path size deduplicated')
+
+
+class UploadTooLarge(ValueError):
+    """Raised once an upload passes the store's max_file_size"""
+
+
+class UploadWriter:
+    """
+    One upload being written: chunks are hashed and counted as they arrive
+
+    write() raises UploadTooLarge (and discards the partial file) as soon
+    as the size limit is passed; commit() moves the file into place.
+    """
+
+    def __init__(self, store):
+        self.store = store
+        self.hasher = hashlib.sha256()
+        self.size = 0
+        self.tmp_path = os.path.join(store.tmp_dir, uuid.uuid4().hex)
+        self.file = open(self.tmp_path, 'wb')
+
+    def write(self, chunk):
+        self.size += len(chunk)
+        if self.size > self.store.max_file_size:
+            self.abort()
+            raise UploadTooLarge(f"Upload exceeds {self.store.max_file_size} bytes")
+        self.hasher.update(chunk)
+        self.file.write(chunk)
+
+    def abort(self):
+        self.file.close()
+        if os.path.exists(self.tmp_path):
+            os.remove(self.tmp_path)
+
+    def commit(self):
+        self.file.close()
+        return self.store._add(self.tmp_path, self.hasher.hexdigest(), self.size)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is not None:
+            self.abort()
+
+
+class UploadStore:
+    """
+    Content-addressed upload storage under a disk quota
+
+    Files live at root/objects/<digest[:2]>/<digest>, so identical uploads
+    are stored once whatever they are called. Once the total passes
+    quota_bytes, the least recently stored or read files are deleted.
+    Recency is kept in file mtimes, so it survives restarts.
+    """
+
+    def __init__(self, root='uploads', max_file_size=16 * 1024 ** 2, quota_bytes=1024 ** 3):
+        self.root = root
+        self.objects_dir = os.path.join(root, 'objects')
+        self.tmp_dir = os.path.join(root, 'tmp')
+        self.max_file_size = max_file_size
+        self.quota_bytes = quota_bytes
+        self.entries = OrderedDict()  # digest -> size, least recently used first
+        self.total_bytes = 0
+        self.deduplicated = 0
+        self.evicted = 0
+        self._lock = Lock()
+        os.makedirs(self.objects_dir, exist_ok=True)
+        os.makedirs(self.tmp_dir, exist_ok=True)
+        self._load()
+
+    def _load(self):
+        # Partial writes left by a crashed run are garbage
+        cutoff = time.time() - STALE_TMP_SECONDS
+        for name in os.listdir(self.tmp_dir):
+            path = os.path.join(self.tmp_dir, name)
+            try:
+                if os.stat(path).st_mtime < cutoff:
+                    os.remove(path)
+            except FileNotFoundError:
+                pass  # committed or removed by its writer meanwhile
+        found = []
+        for shard in os.listdir(self.objects_dir):
+            shard_dir = os.path.join(self.objects_dir, shard)
+            for digest in os.listdir(shard_dir):
+                stat = os.stat(os.path.join(shard_dir, digest))
+                found.append((stat.st_mtime, digest, stat.st_size))
+        for _, digest, size in sorted(found):
+            self.entries[digest] = size
+            self.total_bytes += size
+
+    def path_for(self, digest):
+        return os.path.join(self.objects_dir, digest[:2], digest)
+
+    def writer(self):
+        """UploadWriter for streaming an upload in chunk by chunk"""
+        return UploadWriter(self)
+
+    def put_stream(self, chunks):
+        """Store an iterable of byte chunks; returns a StoredUpload"""
+        with self.writer() as writer:
+            for chunk in chunks:
+                writer.write(chunk)
+            return writer.commit()
+
+    def put(self, source):
+        """Store a path or in-memory upload (bytes, memoryview, BytesIO)"""
+        if is_path(source):
+            with open(source, 'rb') as f:
+                return self.put_stream(iter(lambda: f.read(CHUNK_SIZE), b''))
+        view = memoryview(buffer_of(source)).cast('B')
+        if view.nbytes > self.max_file_size:
+            raise UploadTooLarge(f"Upload exceeds {self.max_file_size} bytes")
+        return self.put_stream(view[i:i + CHUNK_SIZE] for i in range(0, view.nbytes, CHUNK_SIZE))
+
+    def put_async(self, source):
+        """put() in the background; returns a Future"""
+        if not is_path(source):
+            source = buffer_of(source)  # don't share the caller's stream position
+        return _STORE_EXECUTOR.submit(self.put, source)
+
+    def _add(self, tmp_path, digest, size):
+        path = self.path_for(digest)
+        with self._lock:
+            if digest in self.entries:
+                os.remove(tmp_path)
+                self.deduplicated += 1
+                self._touch(digest)
+                return StoredUpload(digest, path, size, True)
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            os.replace(tmp_path, path)
+            self.entries[digest] = size
+            self.total_bytes += size
+            self._evict(keep=digest)
+        return StoredUpload(digest, path, size, False)
+
+    def _touch(self, digest):
+        self.entries.move_to_end(digest)
+        os.utime(self.path_for(digest), (time.time(), time.time()))
+
+    def _evict(self, keep):
+        while self.total_bytes > self.quota_bytes and len(self.entries) > 1:
+            digest, size = next(iter(self.entries.items()))
+            if digest == keep:
+                break
+            del self.entries[digest]
+            self.total_bytes -= size
+            self.evicted += 1
+            try:
+                os.remove(self.path_for(digest))
+            except FileNotFoundError:
+                pass
+
+    def get(self, digest):
+        """Path of a stored upload (marking it recently used), or None"""
+        with self._lock:
+            if digest not in self.entries:
+                return None
+            self._touch(digest)
+            return self.path_for(digest)
+
+    def __contains__(self, digest):
+        return digest in self.entries
+
+    def stats(self):
+        return {
+            'files': len(self.entries),
+            'megabytes': round(self.total_bytes / 1024 ** 2, 2),
+            'quota_megabytes': round(self.quota_bytes / 1024 ** 2, 2),
+            'deduplicated': self.deduplicated,
+            'evicted': self.evicted
+        }
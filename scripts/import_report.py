@@ -0,0 +1,76 @@
+"""
+Cold-start import report for the app's import groups
+
+    python scripts/import_report.py
+    python scripts/import_report.py --json --budget 2.0
+
+Each group is imported in a fresh interpreter (after the core group, as in
+app.py), so times are what a first visit to that mode costs. With
+--budget, exits non-zero if any group takes longer, so a slow new
+top-level import shows up as a failure.
+"""
+import os
+import sys
+import json
+import argparse
+import subprocess
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Keep in step with the timed_imports() blocks in app.py
+IMPORT_GROUPS = {
+    "core": "from config import Config; import result_memo, upload_store, jobs, ai_engine",
+    "data": "import plotly.express; import data_analyzer",
+    "text": "import text_analyzer",
+    "image": "import image_analyzer",
+}
+
+PROBE = """
+import sys, time, json
+sys.path[:0] = [{root!r}, {modules!r}]
+{core}
+before, started = len(sys.modules), time.perf_counter()
+{statement}
+print(json.dumps({{"seconds": time.perf_counter() - started, "modules": len(sys.modules) - before}}))
+"""
+
+
+def measure(group, repeat=3):
+    """Best-of-repeat cold import time for one group"""
+    code = PROBE.format(
+        root=ROOT, modules=os.path.join(ROOT, "modules"),
+        core="" if group == "core" else IMPORT_GROUPS["core"],
+        statement=IMPORT_GROUPS[group]
+    )
+    runs = []
+    for _ in range(repeat):
+        out = subprocess.run([sys.executable, "-c", code], cwd=ROOT, capture_output=True,
+                             text=True, check=True).stdout
+        runs.append(json.loads(out.strip().splitlines()[-1]))
+    best = min(runs, key=lambda run: run["seconds"])
+    return {"group": group, "seconds": round(best["seconds"], 3), "modules": best["modules"]}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure cold import time per app mode")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--budget", type=float, help="fail if any group exceeds this many seconds")
+    parser.add_argument("--json", action="store_true")
+    args = parser.parse_args()
+
+    report = [measure(group, args.repeat) for group in IMPORT_GROUPS]
+    if args.json:
+        print(json.dumps(report, indent=2))
+    else:
+        print(f"{'group':<8}{'seconds':>10}{'modules':>10}")
+        for row in report:
+            print(f"{row['group']:<8}{row['seconds']:>10.3f}{row['modules']:>10}")
+
+    over = [row["group"] for row in report if args.budget and row["seconds"] > args.budget]
+    if over:
+        print(f"❌ Over the {args.budget}s budget: {', '.join(over)}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,141 @@
+"""
+Load test for the headless API (api.py)
+
+    python scripts/load_test.py --start-server --endpoint image --requests 500 --concurrency 32
+    python scripts/load_test.py --url http://127.0.0.1:8000 --endpoint data --unique
+
+Sends synthetic payloads and reports throughput and latency percentiles
+of the successful responses. Exits 1 if any request failed.
+--unique varies every payload so each request misses the result memo.
+"""
+import os
+import sys
+import json
+import time
+import asyncio
+import argparse
+
+import cv2
+import numpy as np
+from tornado.httpclient import AsyncHTTPClient, HTTPRequest, HTTPClientError
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def synthetic_csv(seed, rows=2000):
+    rng = np.random.default_rng(seed)
+    lines = ["id,price,quantity,rating,region"]
+    regions = ["north", "south", "east", "west"]
+    for i in range(rows):
+        lines.append(f"{i},{rng.normal(100, 25):.2f},{rng.integers(1, 50)},"
+                     f"{rng.uniform(1, 5):.1f},{regions[i % 4]}")
+    return "\n".join(lines).encode()
+
+
+def synthetic_png(seed, size=512):
+    rng = np.random.default_rng(seed)
+    image = np.zeros((size, size, 3), np.uint8)
+    for _ in range(12):
+        color = tuple(int(c) for c in rng.integers(0, 255, 3))
+        center = tuple(int(c) for c in rng.integers(0, size, 2))
+        cv2.circle(image, center, int(rng.integers(10, size // 4)), color, -1)
+    return cv2.imencode(".png", image)[1].tobytes()
+
+
+def synthetic_text(seed):
+    return (f"Report {seed}. Quarterly revenue grew strongly while support costs fell. "
+            "Customers praised the new dashboard, though some found onboarding slow. "
+            "The team plans to expand into two new regions next year.")
+
+
+def build_request(base_url, endpoint, seed):
+    """(url, method, body, content type) for one request"""
+    if endpoint == "health":
+        return f"{base_url}/health", "GET", None, None
+    if endpoint == "data":
+        return f"{base_url}/v1/data?name=load.csv", "POST", synthetic_csv(seed), "text/csv"
+    if endpoint == "image":
+        return f"{base_url}/v1/image?name=load.png", "POST", synthetic_png(seed), "image/png"
+    if endpoint == "text":
+        body = json.dumps({"text": synthetic_text(seed)}).encode()
+        return f"{base_url}/v1/text", "POST", body, "application/json"
+    if endpoint == "insight":
+        body = json.dumps({"rows": 1000 + seed, "columns": ["price", "quantity"],
+                           "missing_values": seed % 7}).encode()
+        return f"{base_url}/v1/insights/data?provider=mock", "POST", body, "application/json"
+    raise ValueError(f"Unknown endpoint {endpoint}")
+
+
+def percentile(ordered, q):
+    return ordered[min(len(ordered) - 1, int(len(ordered) * q / 100))]
+
+
+async def run_load(base_url, endpoint, total, concurrency, unique):
+    client = AsyncHTTPClient(max_clients=concurrency)
+    # Build payloads up front so generation time isn't measured
+    variants = total if unique else 1
+    payloads = [build_request(base_url, endpoint, seed) for seed in range(variants)]
+    latencies, errors = [], 0  # latencies of successful responses only
+    queue = iter(range(total))
+
+    async def worker():
+        nonlocal errors
+        for i in queue:
+            url, method, body, content_type = payloads[i % variants]
+            request = HTTPRequest(url, method=method, body=body, request_timeout=120,
+                                  headers={"Content-Type": content_type} if content_type else None)
+            started = time.perf_counter()
+            try:
+                await client.fetch(request)
+            except (HTTPClientError, OSError):
+                errors += 1
+                continue
+            latencies.append(time.perf_counter() - started)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - started
+
+    latencies.sort()
+    report = {
+        "endpoint": endpoint,
+        "requests": total,
+        "concurrency": concurrency,
+        "errors": errors,
+        "seconds": round(elapsed, 3),
+        # Failed requests are often fast; counting them would inflate throughput
+        "requests_per_second": round(len(latencies) / elapsed, 1)
+    }
+    if latencies:
+        report.update({f"p{q}_ms": round(percentile(latencies, q) * 1000, 2) for q in (50, 90, 99)})
+        report["max_ms"] = round(latencies[-1] * 1000, 2)
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Load test the Smart Insight API")
+    parser.add_argument("--url", default="http://127.0.0.1:8000")
+    parser.add_argument("--endpoint", default="health",
+                        choices=["health", "data", "image", "text", "insight"])
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--unique", action="store_true", help="vary payloads to defeat the memo")
+    parser.add_argument("--start-server", action="store_true", help="serve api.py in-process")
+    args = parser.parse_args()
+
+    url = args.url
+    if args.start_server:
+        sys.path.insert(0, ROOT)
+        from api import start_background
+        url = f"http://127.0.0.1:{start_background()}"
+
+    report = asyncio.run(run_load(url, args.endpoint, args.requests, args.concurrency, args.unique))
+    print(json.dumps(report, indent=2))
+    if report["errors"]:
+        print(f"❌ {report['errors']} of {report['requests']} requests failed; "
+              "throughput counts successful responses only", file=sys.stderr)
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -6,6 +6,7 @@ print("="*60)
 # Download required packages
 packages = [
     'punkt',           # Sentence tokenizer
+    'punkt_tab',       # Sentence tokenizer tables (NLTK 3.8.2+)
     'stopwords',       # Common words to filter
     'averaged_perceptron_tagger',  # Part-of-speech tagger
     'brown',           # Brown corpus
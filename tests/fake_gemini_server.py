@@ -0,0 +1,167 @@
+"""
+Local stand-in for the Gemini REST API with injectable latency and errors
+
+Run it and point the engine at it:
+
+    python tests/fake_gemini_server.py --port 8765 --tail-rate 0.05 --error-rate 0.1
+    GEMINI_BASE_URL=http://127.0.0.1:8765 streamlit run app.py
+
+or start it in-process with start_server() for scripted checks.
+"""
+import sys
+import json
+import time
+import random
+import argparse
+from collections import deque
+from threading import Lock, Thread
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+class FakeGeminiServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, address, latency=0.05, tail_latency=2.0, tail_rate=0.0,
+                 error_rate=0.0, error_status=503, chunked_streams=False, seed=None):
+        super().__init__(address, FakeGeminiHandler)
+        self.latency = latency
+        self.tail_latency = tail_latency
+        self.tail_rate = tail_rate
+        self.error_rate = error_rate
+        self.error_status = error_status
+        self.chunked_streams = chunked_streams
+        self.random = random.Random(seed)
+        self.requests = 0
+        self.planned = deque()
+        self._lock = Lock()
+
+    @property
+    def url(self):
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def handle_error(self, request, client_address):
+        # Clients abandoning a slow or stalled response is expected here
+        if not isinstance(sys.exc_info()[1], ConnectionError):
+            super().handle_error(request, client_address)
+
+    def plan(self, *responses):
+        """
+        Script the next requests exactly, ahead of the random draws
+
+        Each response is a dict with optional delay (s, before replying),
+        fail (bool), status (error status) and stall (s, pause in a stream
+        after its first chunk).
+        """
+        with self._lock:
+            self.planned.extend(responses)
+
+    def draw(self):
+        """Count a request and decide its behaviour (see plan())"""
+        with self._lock:
+            self.requests += 1
+            if self.planned:
+                planned = self.planned.popleft()
+                return {'delay': self.latency, 'fail': False, 'status': self.error_status,
+                        'stall': 0.0, **planned}
+            slow = self.random.random() < self.tail_rate
+            fail = self.random.random() < self.error_rate
+        return {'delay': self.tail_latency if slow else self.latency, 'fail': fail,
+                'status': self.error_status, 'stall': 0.0}
+
+
+class FakeGeminiHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'  # keep-alive, like the real API
+    disable_nagle_algorithm = True  # headers and body go out as separate writes
+
+    def log_message(self, format, *args):
+        pass
+
+    def _send_json(self, status, payload):
+        body = json.dumps(payload).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _send_stream(self, text, stall):
+        """
+        Send text word by word as SSE events
+
+        With chunked_streams the body is chunk-encoded and the connection
+        stays open afterwards, as with the real API; otherwise the body
+        ends when the server closes the socket.
+        """
+        chunked = self.server.chunked_streams
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/event-stream')
+        if chunked:
+            self.send_header('Transfer-Encoding', 'chunked')
+        else:
+            self.send_header('Connection', 'close')
+        self.end_headers()
+        for i, word in enumerate(text.split(' ')):
+            chunk = {'candidates': [{'content': {'parts': [{'text': word + ' '}]}}]}
+            event = f"data: {json.dumps(chunk)}\n\n".encode('utf-8')
+            if chunked:
+                event = f"{len(event):x}\r\n".encode('ascii') + event + b"\r\n"
+            self.wfile.write(event)
+            self.wfile.flush()
+            time.sleep(stall if i == 0 else 0.01)
+        if chunked:
+            self.wfile.write(b"0\r\n\r\n")
+        else:
+            self.close_connection = True
+
+    def do_POST(self):
+        length = int(self.headers.get('Content-Length', 0))
+        request = json.loads(self.rfile.read(length) or b'{}')
+        prompt = ''.join(
+            part.get('text', '')
+            for content in request.get('contents', []) for part in content.get('parts', [])
+        )
+        behaviour = self.server.draw()
+        time.sleep(behaviour['delay'])
+
+        if behaviour['fail']:
+            self._send_json(behaviour['status'], {
+                'error': {'code': behaviour['status'], 'message': 'injected failure'}
+            })
+            return
+
+        text = f"Fake insight ({len(prompt)} prompt chars): {' '.join(prompt.split()[:12])}"
+        if ':streamGenerateContent' in self.path:
+            self._send_stream(text, behaviour['stall'])
+            return
+
+        self._send_json(200, {'candidates': [{'content': {'parts': [{'text': text}]}}]})
+
+
+def start_server(port=0, **options):
+    """Serve in a daemon thread; returns the server (see .url, .requests)"""
+    server = FakeGeminiServer(('127.0.0.1', port), **options)
+    Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Fake Gemini REST server")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--latency", type=float, default=0.05, help="normal response delay (s)")
+    parser.add_argument("--tail-latency", type=float, default=2.0, help="slow response delay (s)")
+    parser.add_argument("--tail-rate", type=float, default=0.0, help="fraction of slow responses")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="fraction of failed responses")
+    parser.add_argument("--error-status", type=int, default=503)
+    parser.add_argument("--chunked-streams", action="store_true",
+                        help="send streams chunked over keep-alive, like the real API")
+    parser.add_argument("--seed", type=int, default=None)
+    args = parser.parse_args()
+
+    server = FakeGeminiServer(
+        ('127.0.0.1', args.port), latency=args.latency, tail_latency=args.tail_latency,
+        tail_rate=args.tail_rate, error_rate=args.error_rate, error_status=args.error_status,
+        chunked_streams=args.chunked_streams, seed=args.seed
+    )
+    print(f"🧪 Fake Gemini listening on {server.url}")
+    server.serve_forever()
@@ -1,5 +1,8 @@
 import os
 from modules.image_analyzer import ImageAnalyzer
+from modules.instrumentation import set_verbose
+
+set_verbose(True)  # show the analyzers' step-by-step output
 
 print("\n" + "="*80)
 print("TEST 1: TEXT ANALYSIS ✓")
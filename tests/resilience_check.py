@@ -0,0 +1,168 @@
+"""
+Retry, hedging, stream deadline, keep-alive and circuit breaker checks against the
+fake Gemini server (no API key or network needed)
+
+    python tests/resilience_check.py
+"""
+import os
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path[:0] = [ROOT, os.path.dirname(os.path.abspath(__file__))]
+
+from fake_gemini_server import start_server
+from modules.gemini_rest import GeminiRestModel, GeminiHTTPError
+from modules.resilient_client import CircuitBreaker, CircuitOpenError, ResilientClient
+
+server = model = None  # set by main()
+failures = []
+
+
+def client(**options):
+    options = {'retries': 2, 'backoff': 0.01, 'deadline': 5.0,
+               'breaker': CircuitBreaker(failure_threshold=3, reset_timeout=60.0), **options}
+    return ResilientClient(lambda prompt: model.generate_content(prompt).text, **options)
+
+
+def check(name, condition, detail=""):
+    print(f"  {'✓' if condition else '✗'} {name}" + (f" ({detail})" if detail else ""))
+    if not condition:
+        failures.append(name)
+
+
+def stream(resilient, prompt="stream me"):
+    return ''.join(chunk.text for chunk in resilient.stream(
+        lambda: model.generate_content(prompt, stream=True)))
+
+
+def main():
+    global server, model
+    server = start_server(latency=0.02)
+    model = GeminiRestModel(server.url, "test-key", "gemini-test")
+
+    print("\n" + "="*80)
+    print("RETRIES")
+    print("="*80)
+    resilient, stats = client(), {}
+    server.plan({'fail': True, 'status': 503})
+    text = resilient.generate("retry me", stats)
+    check("503 is retried", text.startswith("Fake insight") and stats['retries'] == 1, stats)
+
+    resilient, before = client(), server.requests
+    server.plan({'fail': True, 'status': 400})
+    try:
+        resilient.generate("bad request")
+        check("400 is not retried", False, "no error raised")
+    except GeminiHTTPError as e:
+        check("400 is not retried", e.code == 400 and server.requests - before == 1)
+
+    calls = []
+    resilient = ResilientClient(lambda prompt: calls.append(prompt) or (_ for _ in ()).throw(
+        ValueError("response was blocked")), retries=2, backoff=0.01)
+    try:
+        resilient.generate("blocked")
+    except ValueError:
+        pass
+    check("ValueError raised at once, not counted as an outage",
+          len(calls) == 1 and resilient.breaker.failures == 0, f"{len(calls)} calls")
+
+    print("\n" + "="*80)
+    print("HEDGING")
+    print("="*80)
+    resilient, stats = client(hedge=True), {}
+    for i in range(20):
+        resilient.generate(f"warm-up {i}")  # p95 needs 20 samples
+    server.plan({'delay': 2.0})
+    started = time.monotonic()
+    text = resilient.generate("slow one", stats)
+    elapsed = time.monotonic() - started
+    check("slow call is hedged", stats['hedges'] == 1 and elapsed < 1.0, f"{elapsed:.2f}s, {stats}")
+
+    resilient, stats = client(hedge=True), {}
+    for i in range(20):
+        stream(resilient, f"warm-up {i}")
+    server.plan({'delay': 2.0})
+    started = time.monotonic()
+    text = stream(resilient)
+    elapsed = time.monotonic() - started
+    check("slow first chunk is hedged", text.startswith("Fake insight") and elapsed < 1.5,
+          f"{elapsed:.2f}s, {resilient.hedged} hedges")
+
+    print("\n" + "="*80)
+    print("STREAM DEADLINES")
+    print("="*80)
+    resilient = client(retries=0, first_chunk_timeout=0.3)
+    server.plan({'delay': 2.0})
+    started = time.monotonic()
+    try:
+        stream(resilient)
+        check("first-chunk deadline", False, "no error raised")
+    except TimeoutError:
+        elapsed = time.monotonic() - started
+        check("first-chunk deadline", elapsed < 1.0 and resilient.breaker.failures == 1, f"{elapsed:.2f}s")
+
+    resilient = client(idle_timeout=0.3)
+    server.plan({'stall': 2.0})
+    started = time.monotonic()
+    try:
+        stream(resilient)
+        check("idle deadline", False, "no error raised")
+    except TimeoutError:
+        elapsed = time.monotonic() - started
+        check("idle deadline", elapsed < 1.0 and resilient.breaker.failures == 1, f"{elapsed:.2f}s")
+
+    print("\n" + "="*80)
+    print("KEEP-ALIVE STREAMS")
+    print("="*80)
+    chunked = start_server(latency=0.02, chunked_streams=True)
+    keep_alive = GeminiRestModel(chunked.url, "test-key", "gemini-test")
+    chunks = keep_alive.generate_content("stream me over keep-alive", stream=True)
+    first = next(chunks).text
+    reply = keep_alive.generate_content("sent mid-stream").text  # same thread, same pool
+    text = first + ''.join(chunk.text for chunk in chunks)
+    check("request sent mid-stream doesn't cut the stream short",
+          text.strip().endswith("keep-alive") and reply.startswith("Fake insight"), repr(text))
+
+    resilient = ResilientClient(lambda prompt: keep_alive.generate_content(prompt).text,
+                                retries=0, idle_timeout=2.0)
+    texts = [''.join(chunk.text for chunk in resilient.stream(
+        lambda: keep_alive.generate_content(f"chunked {i}", stream=True))) for i in range(3)]
+    replies = [resilient.generate(f"after {i}") for i in range(3)]
+    check("chunked streams and calls share the executor threads",
+          all(t.strip().endswith(f"chunked {i}") for i, t in enumerate(texts))
+          and all(r.startswith("Fake insight") for r in replies), texts)
+    chunked.shutdown()
+
+    print("\n" + "="*80)
+    print("CIRCUIT BREAKER")
+    print("="*80)
+    resilient = client(retries=0)
+    server.plan(*[{'fail': True}] * 3)
+    for i in range(3):
+        try:
+            resilient.generate(f"failing {i}")
+        except GeminiHTTPError:
+            pass
+    before = server.requests
+    try:
+        resilient.generate("while open")
+        check("breaker opens after 3 failures", False, "call went through")
+    except CircuitOpenError:
+        check("breaker opens after 3 failures",
+              resilient.breaker.state == 'open' and server.requests == before)
+    try:
+        stream(resilient)
+        check("open breaker also rejects streams", False, "call went through")
+    except CircuitOpenError:
+        check("open breaker also rejects streams", server.requests == before)
+
+    print("\n" + "="*80)
+    print(f"{'✅ ALL PASSED' if not failures else f'❌ {len(failures)} FAILED'}")
+    print("="*80)
+    server.shutdown()
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
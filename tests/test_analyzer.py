@@ -1,6 +1,9 @@
 from modules.data_analyzer import DataAnalyzer
+from modules.instrumentation import set_verbose
 import pandas as pd
 
+set_verbose(True)  # show the analyzer's report
+
 # Change this to your CSV file path
 CSV_FILE = 'data/sales_data_sample.csv'
 